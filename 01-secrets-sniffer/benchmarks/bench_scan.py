@@ -0,0 +1,236 @@
+"""
+Scanner benchmark: generates a synthetic repository with planted secrets,
+runs scan.py over it and reports throughput, peak memory and recall.
+
+    python benchmarks/bench_scan.py --small-files 5000 --huge-files 2 --jobs 1,4
+
+Results are written as JSON under benchmarks/results/ so runs can be compared over time.
+"""
+import os
+import sys
+import json
+import time
+import random
+import string
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SKILL_DIR = os.path.join(BENCH_DIR, "..", "skill")
+sys.path.insert(0, SKILL_DIR)
+
+from scan import FileFilter, scan_directory, iter_files  # noqa: E402
+
+# Filler vocabulary: ordinary code that never matches a PATTERNS rule
+FILLER_LINES = [
+    "def handler(event, context):",
+    "    result = compute_total(items, discount)",
+    "    for index, value in enumerate(values):",
+    "        logger.info('processing %s', value)",
+    "    return {'status': 'ok', 'count': len(items)}",
+    "class OrderService(BaseService):",
+    "    timeout_seconds = 30",
+    "# TODO: move this into the shared utilities module",
+    "import json, os, sys",
+    "",
+]
+
+
+def _random_token(rng, alphabet, length):
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+def _planted_secret(rng):
+    """Returns (line, type) for one secret that scan.py must find."""
+    kind = rng.randrange(3)
+    if kind == 0:
+        key = "AKIA" + _random_token(rng, string.ascii_uppercase + string.digits, 16)
+        return f"aws_access = {key!r}", "AWS Key"
+    if kind == 1:
+        key = "sk_live_" + _random_token(rng, string.ascii_letters + string.digits, 24)
+        return f"stripe = Client({key!r})", "Stripe Key"
+    value = _random_token(rng, string.ascii_letters + string.digits, 20)
+    return f'db_password = "{value}"', "Generic Secret"
+
+def _write_text_file(path, relpath, lines, density, rng, truth):
+    """Writes `lines` lines of filler; each line is a planted secret with probability `density`."""
+    with open(path, "w", encoding="utf-8") as f:
+        for line_number in range(1, lines + 1):
+            if rng.random() < density:
+                line, kind = _planted_secret(rng)
+                truth.append([relpath, line_number, kind])
+            else:
+                line = rng.choice(FILLER_LINES)
+            f.write(line + "\n")
+
+def generate_corpus(root, small_files, small_lines, huge_files, huge_lines, binaries,
+                    depth, ignored_files, density, seed):
+    """
+    Builds the synthetic repository under `root`.
+    Returns the ground truth as a list of [relpath, line_number, type].
+    """
+    rng = random.Random(seed)
+    truth = []
+
+    # Many small files spread over a shallow tree
+    for i in range(small_files):
+        relpath = f"src/pkg{i % 50:02d}/module_{i}.py"
+        os.makedirs(os.path.join(root, os.path.dirname(relpath)), exist_ok=True)
+        _write_text_file(os.path.join(root, relpath), relpath, small_lines, density, rng, truth)
+
+    # A few huge files
+    os.makedirs(os.path.join(root, "data"), exist_ok=True)
+    for i in range(huge_files):
+        relpath = f"data/huge_{i}.py"
+        _write_text_file(os.path.join(root, relpath), relpath, huge_lines, density, rng, truth)
+
+    # Binaries (with NUL bytes) that must be skipped
+    os.makedirs(os.path.join(root, "assets"), exist_ok=True)
+    for i in range(binaries):
+        with open(os.path.join(root, "assets", f"blob_{i}.bin"), "wb") as f:
+            f.write(b"\0" + rng.randbytes(256 * 1024))
+
+    # One deep chain of directories, one file per level
+    relpath = "deep"
+    for level in range(depth):
+        relpath = f"{relpath}/d{level}"
+        os.makedirs(os.path.join(root, relpath), exist_ok=True)
+        file_relpath = f"{relpath}/leaf.py"
+        _write_text_file(os.path.join(root, file_relpath), file_relpath, small_lines, density, rng, truth)
+
+    # Vendored dependencies the walker should prune; their secrets are not ground truth
+    os.makedirs(os.path.join(root, "node_modules", "left-pad"), exist_ok=True)
+    for i in range(ignored_files):
+        _write_text_file(os.path.join(root, "node_modules", "left-pad", f"index_{i}.js"),
+                         "", small_lines, density, rng, [])
+
+    return truth
+
+def peak_rss_mb():
+    """Peak resident memory of this process and its finished children, in MB (Linux reports KB)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+def run_once(root, jobs, max_file_size=0):
+    """
+    Scans the corpus once in this process and returns the raw measurements.
+    `max_file_size` is the scanner's size cap (0 = none, so the huge files are scanned).
+    Files the walker leaves out (pruned folders, over the cap) are counted as skipped.
+    """
+    file_filter = FileFilter.for_directory(root, max_file_size=max_file_size)
+    filepaths = list(iter_files(root, file_filter))
+    total_bytes = sum(os.path.getsize(path) for path in filepaths)
+
+    scanned = set(filepaths)
+    skipped = [os.path.join(folder, name) for folder, _, names in os.walk(root) for name in names]
+    skipped = [path for path in skipped if path not in scanned]
+
+    start = time.perf_counter()
+    findings = scan_directory(root, jobs=jobs, file_filter=file_filter)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "jobs": jobs,
+        "seconds": round(elapsed, 4),
+        "files": len(filepaths),
+        "bytes": total_bytes,
+        "skipped_files": len(skipped),
+        "skipped_bytes": sum(os.path.getsize(path) for path in skipped),
+        "files_per_s": round(len(filepaths) / elapsed, 1),
+        "mb_per_s": round(total_bytes / elapsed / 1e6, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "findings": [[os.path.relpath(f.file, root).replace(os.sep, "/"), f.line_number, f.type]
+                     for f in findings]
+    }
+
+def score(run, truth):
+    """Recall of planted secrets, plus how many findings were not planted."""
+    found = {tuple(item) for item in run.pop("findings")}
+    planted = {tuple(item) for item in truth}
+    run["planted"] = len(planted)
+    run["recall"] = round(len(found & planted) / len(planted), 4) if planted else 1.0
+    run["unplanted_findings"] = len(found - planted)
+    return run
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "-C", BENCH_DIR, "rev-parse", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan.py on a synthetic repository.")
+    parser.add_argument("--small-files", type=int, default=2000)
+    parser.add_argument("--small-lines", type=int, default=200)
+    parser.add_argument("--huge-files", type=int, default=2)
+    parser.add_argument("--huge-lines", type=int, default=500_000)
+    parser.add_argument("--binaries", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=40)
+    parser.add_argument("--ignored-files", type=int, default=500)
+    parser.add_argument("--density", type=float, default=0.001,
+                        help="Probability that a line is a planted secret.")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--max-file-size", type=int, default=0, metavar="BYTES",
+                        help="Scanner size cap (0 = no limit, so the huge files are scanned too).")
+    parser.add_argument("--jobs", default="1",
+                        help="Comma-separated worker counts to benchmark, e.g. 1,4,16")
+    parser.add_argument("--corpus", help="Keep the corpus in this folder instead of a temp dir.")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/scan-<timestamp>.json).")
+    # Internal: measure one run in a fresh process so peak RSS isn't shared between runs
+    parser.add_argument("--run-one", nargs=2, metavar=("ROOT", "JOBS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        root, jobs = args.run_one
+        print(json.dumps(run_once(root, int(jobs), args.max_file_size)))
+        return
+
+    corpus = {key: getattr(args, key) for key in
+              ("small_files", "small_lines", "huge_files", "huge_lines", "binaries",
+               "depth", "ignored_files", "density", "seed")}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = args.corpus or tmp_dir
+        os.makedirs(root, exist_ok=True)
+
+        print(f"🏗️  Generating corpus in {root}...")
+        truth = generate_corpus(root, **corpus)
+        print(f"   -> {len(truth)} planted secrets.")
+
+        runs = []
+        for jobs in (int(value) for value in args.jobs.split(",")):
+            print(f"⏱️  Scanning with --jobs {jobs}...")
+            result = subprocess.run([sys.executable, __file__, "--run-one", root, str(jobs),
+                                     "--max-file-size", str(args.max_file_size)],
+                                    capture_output=True, text=True, check=True)
+            run = score(json.loads(result.stdout), truth)
+            runs.append(run)
+            print(f"   -> {run['files']} files ({run['bytes'] / 1e6:.1f} MB) scanned, "
+                  f"{run['skipped_files']} ({run['skipped_bytes'] / 1e6:.1f} MB) skipped")
+            print(f"   -> {run['files_per_s']} files/s, {run['mb_per_s']} MB/s, "
+                  f"peak RSS {run['peak_rss_mb']} MB, recall {run['recall']:.2%}")
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "corpus": corpus,
+        "max_file_size": args.max_file_size,
+        "runs": runs
+    }
+
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"scan-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Results saved to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,273 @@
 import os
-import subprocess
+import time
+import random
+import hashlib
+import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from prefilter import iter_ambiguous
+from scan import Baseline, iter_findings
 
 # 1. Load the API Key from the .env file
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 
-def run_scanner():
-    """Runs the scan.py script and captures the JSON output."""
-    # Running the tool (The Hunter)
-    result = subprocess.run(
-        ["python", "scan.py", "../dummy_project"], 
-        capture_output=True, 
-        text=True
-    )
-    try:
-        return json.loads(result.stdout)
-    except json.JSONDecodeError:
-        return []
+SKILL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODEL = "gpt-4o"  # You can use "gpt-4-turbo" or "gpt-3.5-turbo" too
+
+# --- Triage Settings ---
+# Findings per request are capped by an estimated token budget (~4 chars per token)
+BATCH_TOKEN_BUDGET = 6000
+# How many batches are in flight at once
+MAX_CONCURRENT_REQUESTS = 4
+# Retries per batch on rate limits / network errors, with exponential backoff
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+# Verdicts are remembered here, so re-runs only send new findings
+VERDICT_CACHE_PATH = os.path.join(SKILL_DIR, ".triage_cache.json")
+# Paths shown to the model per deduplicated finding
+MAX_LOCATIONS_IN_PROMPT = 3
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
 
 def read_docs():
     """Reads the instruction manual (The Knowledge)."""
     try:
-        with open("docs.md", "r", encoding="utf-8") as f:
+        with open(os.path.join(SKILL_DIR, "docs.md"), "r", encoding="utf-8") as f:
             return f.read()
     except FileNotFoundError:
         return "No documentation found."
 
-def analyze_with_agent():
-    print("🕵️  Agent is starting...")
-    
-    # --- Step 1: Use the Tool ---
-    print("1. Running scan tool...")
-    raw_findings = run_scanner()
-    print(f"   -> Found {len(raw_findings)} potential matches.")
-
-    # --- Step 2: Get the Knowledge ---
-    print("2. Reading skill documentation...")
-    rules = read_docs()
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def fingerprint(finding_type, content):
+    """Stable ID for a finding: its type plus whitespace-normalized content."""
+    normalized = " ".join(content.split())
+    return hashlib.sha256(f"{finding_type}\0{normalized}".encode("utf-8")).hexdigest()
+
+def new_group(finding):
+    """A deduplicated finding; each group is judged once, whatever its number of locations."""
+    return {
+        "fingerprint": fingerprint(finding.type, finding.content),
+        "type": finding.type,
+        "content": finding.content,
+        "locations": [(finding.file, finding.line_number)],
+        "verdict": None
+    }
+
+def group_cost(group):
+    """Estimated prompt tokens one group adds to a batch."""
+    return estimate_tokens(group["content"]) + 20 * min(len(group["locations"]), MAX_LOCATIONS_IN_PROMPT)
+
+
+class VerdictCache:
+    """
+    On-disk verdicts keyed by finding fingerprint.
+    Stamped with a hash of the rules and model, so editing docs.md re-judges everything.
+    """
 
-    # --- Step 3: Construct the Prompt ---
-    # This combines the "Dumb" tool output with the "Smart" docs
-    prompt = f"""
+    def __init__(self, path, rules, model=MODEL):
+        self.path = path
+        self.stamp = hashlib.sha256(f"{model}\0{rules}".encode("utf-8")).hexdigest()
+        self.verdicts = {}
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("stamp") == self.stamp:
+                self.verdicts = data.get("verdicts", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def get(self, key):
+        return self.verdicts.get(key)
+
+    def update(self, verdicts):
+        self.verdicts.update(verdicts)
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stamp": self.stamp, "verdicts": self.verdicts}, f)
+        os.replace(tmp_path, self.path)
+
+
+def build_batch_prompt(batch, rules):
+    items = []
+    for i, group in enumerate(batch):
+        items.append({
+            "id": str(i),
+            "type": group["type"],
+            "content": group["content"],
+            "files": [path for path, _ in group["locations"][:MAX_LOCATIONS_IN_PROMPT]]
+        })
+
+    return f"""
     You are a Senior Security Engineer.
-    
+
     I have run a pattern matching tool to find secrets in my code.
-    Here is the RAW OUTPUT from the tool:
-    {json.dumps(raw_findings, indent=2)}
+    Here are the deduplicated findings (JSON, one entry per unique match):
+    {json.dumps(items)}
 
     Here are the RULES for analyzing these findings:
     {rules}
 
     TASK:
-    Analyze the raw output against the rules.
-    1. Filter out the False Positives (like placeholders or test files).
-    2. Identify TRUE POSITIVES (Critical risks).
-    3. For each True Positive, explain WHY it is dangerous based on the rules.
-    
+    Judge every finding against the rules.
+    If a finding appears in several files, judge it as real if ANY file is outside test folders.
+
     Output format:
-    Provide a concise report.
+    Return JSON: {{"verdicts": [{{"id": "<id>", "verdict": "true_positive" | "false_positive", "reason": "<one sentence>"}}]}}
+    """
+
+def call_with_retry(fn):
+    """Retries transient API errors with exponential backoff and jitter."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return fn()
+        except RETRYABLE_ERRORS:
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, RETRY_BASE_DELAY))
+
+def triage_batch(client, batch, rules):
+    """Sends one batch to the model and returns {fingerprint: verdict}."""
+    response = call_with_retry(lambda: client.chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful security assistant."},
+            {"role": "user", "content": build_batch_prompt(batch, rules)}
+        ],
+        response_format={"type": "json_object"}
+    ))
+
+    verdicts = {}
+    for item in json.loads(response.choices[0].message.content).get("verdicts", []):
+        try:
+            group = batch[int(item["id"])]
+        except (KeyError, ValueError, IndexError):
+            continue
+        verdicts[group["fingerprint"]] = {
+            "verdict": item.get("verdict", "false_positive"),
+            "reason": item.get("reason", "")
+        }
+    return verdicts
+
+def triage_findings(findings, rules, client, cache, token_budget=BATCH_TOKEN_BUDGET):
     """
+    The Triage Pipeline: Dedupe -> Skip cached -> Batch -> Judge concurrently.
+    `findings` can be a live generator: every batch is sent as soon as it fills up,
+    while the scan is still running.
+    Returns the deduplicated groups with a `verdict` attached (None if triage failed).
+    """
+    groups = {}
+    batch, used, sent = [], 0, 0
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as pool:
+        for finding in findings:
+            key = fingerprint(finding.type, finding.content)
+            if key in groups:
+                groups[key]["locations"].append((finding.file, finding.line_number))
+                continue
+
+            group = groups[key] = new_group(finding)
+            if cache.get(key) is not None:
+                continue
+
+            cost = group_cost(group)
+            if batch and used + cost > token_budget:
+                futures.append(pool.submit(triage_batch, client, batch, rules))
+                batch, used = [], 0
+            batch.append(group)
+            used += cost
+            sent += 1
+
+        if batch:
+            futures.append(pool.submit(triage_batch, client, batch, rules))
+
+        for future in futures:
+            try:
+                cache.update(future.result())
+            except Exception as e:
+                print(f"   ⚠️  A batch failed and was skipped: {e}")
+
+    print(f"   -> {len(groups)} unique findings, {len(groups) - sent} cached, "
+          f"{sent} sent in {len(futures)} batch(es).")
+    if futures:
+        cache.save()
+
+    for group in groups.values():
+        group["verdict"] = cache.get(group["fingerprint"])
+    return list(groups.values())
+
+def print_report(groups):
+    print("\n" + "="*40)
+    print("🤖 AGENT REPORT")
+    print("="*40)
 
-    # --- Step 4: The Intelligence Layer (OpenAI) ---
+    critical = [group for group in groups if group["verdict"] and group["verdict"]["verdict"] == "true_positive"]
+    unknown = [group for group in groups if not group["verdict"]]
+
+    for group in critical:
+        for path, line in group["locations"]:
+            print(f"🚨 **CRITICAL**: Found {group['type']} in {path}:{line}. "
+                  f"Reasoning: {group['verdict']['reason']}")
+    for group in unknown:
+        path, line = group["locations"][0]
+        print(f"⚠️  Not triaged: {group['type']} in {path}:{line} (+{len(group['locations']) - 1} more)")
+
+    # Only an all-clear when every finding got a verdict
+    if unknown:
+        print(f"⚠️  Triage incomplete: {len(unknown)} finding(s) could not be triaged"
+              f"{f', {len(critical)} confirmed' if critical else ''}. Review them manually.")
+    elif not critical:
+        print("✅ No real secrets found.")
+
+def analyze_with_agent(target_dir, jobs=1, baseline=None):
+    print("🕵️  Agent is starting...")
+
+    # --- Step 1: Get the Knowledge ---
+    print("1. Reading skill documentation...")
+    rules = read_docs()
+
+    # --- Step 2: Use the Tool, filtering with local rules as findings stream in ---
+    # The scanner runs in-process; triage starts while it is still walking the tree.
+    print(f"2. Scanning {target_dir} and pre-filtering with local rules...")
+    decided = []
+    # Findings in the baseline are dropped at scan time and never cost a model call.
+    ambiguous = iter_ambiguous(iter_findings(target_dir, jobs=jobs, baseline=baseline), decided, target_dir)
+
+    # --- Step 3: The Intelligence Layer (OpenAI) ---
     if api_key:
-        print("3. Sending to OpenAI (GPT-4o) for analysis...")
-        
+        print(f"3. Triaging ambiguous findings with OpenAI ({MODEL})...")
+
         client = OpenAI(api_key=api_key)
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",  # You can use "gpt-4-turbo" or "gpt-3.5-turbo" too
-                messages=[
-                    {"role": "system", "content": "You are a helpful security assistant."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            print("\n" + "="*40)
-            print("🤖 AGENT REPORT")
-            print("="*40)
-            print(response.choices[0].message.content)
-            
-        except Exception as e:
-            print(f"Error calling OpenAI: {e}")
+        cache = VerdictCache(VERDICT_CACHE_PATH, rules)
+        groups = triage_findings(ambiguous, rules, client, cache)
     else:
+        groups = [new_group(finding) for finding in ambiguous]
         print("\n❌ Error: No OPENAI_API_KEY found in .env file.")
 
+    print(f"   -> {len(decided)} decided locally, {len(groups)} unique ambiguous.")
+    local_groups = []
+    for finding, verdict in decided:
+        group = new_group(finding)
+        group["verdict"] = verdict
+        local_groups.append(group)
+
+    print_report(local_groups + groups)
+
 if __name__ == "__main__":
-    analyze_with_agent()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scan a project for secrets and triage the findings.")
+    parser.add_argument("directory", nargs="?", default=os.path.relpath(os.path.join(SKILL_DIR, "..", "dummy_project")))
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Scanner worker processes.")
+    parser.add_argument("--baseline", metavar="PATH", help="Baseline of accepted findings to skip (see scan.py).")
+    args = parser.parse_args()
+
+    baseline = Baseline.load(args.baseline) if args.baseline else None
+    analyze_with_agent(args.directory, jobs=args.jobs, baseline=baseline)
@@ -1,58 +1,596 @@
 import os
+import io
 import re
-import json
+import bisect
 import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
 
 # Regex patterns to catch potential secrets
 # Updated to be more permissive to catch our "Fake" GitHub-safe keys
 PATTERNS = {
     "AWS Key": r"AKIA[0-9A-Z]{16}",
     # Matches anything starting with sk_live_ (non-whitespace)
-    "Stripe Key": r"sk_live_\S+", 
+    "Stripe Key": r"sk_live_\S+",
     # Catch generic keys/passwords that are 8+ chars long
     "Generic Secret": r"(key|password|secret|token)\s*=\s*['\"][a-zA-Z0-9_\-]{8,}['\"]"
 }
 
-def scan_directory(directory):
-    results = []
-    
-    # Walk through the directory
-    for root, _, files in os.walk(directory):
-        for file in files:
-            # Skip python cache or git files
-            if "__pycache__" in root or ".git" in root:
-                continue
-                
-            filepath = os.path.join(root, file)
-            
+
+# Literal text every rule above starts with. A buffer without any of these
+# can't hold a finding, so it is skipped after one fast scan.
+PREFILTER = r"AKIA|sk_live_|key|password|secret|token"
+NEWLINE = re.compile("\n")
+
+
+class PatternEngine:
+    """
+    Scans a whole buffer with each compiled rule, instead of every rule on every line.
+
+    A literal prefilter (one alternation of plain strings, which the regex
+    engine searches quickly) rejects hit-free buffers in a single pass. Otherwise each
+    rule searches the buffer on its own, and match offsets are mapped to lines
+    with a newline index (bisect). Findings stay line-scoped like the old
+    per-line loop: one finding per (line, rule), in line then PATTERNS order.
+    """
+
+    def __init__(self, patterns, prefilter=None):
+        self.labels = list(patterns)
+        self.rules = [re.compile(pattern) for pattern in patterns.values()]
+        self.prefilter = re.compile(prefilter) if prefilter else None
+
+    def scan_text(self, text):
+        """Returns a list of (line_number, label, line) tuples for a whole buffer."""
+        if self.prefilter is not None and not self.prefilter.search(text):
+            return []
+
+        # Offsets of every newline, built on the first match only
+        newlines = None
+        found = []
+        for index, rule in enumerate(self.rules):
+            pos = 0
+            while True:
+                match = rule.search(text, pos)
+                if match is None:
+                    break
+                if newlines is None:
+                    newlines = [m.start() for m in NEWLINE.finditer(text)]
+
+                start = match.start()
+                line = bisect.bisect_left(newlines, start)
+                line_start = newlines[line - 1] + 1 if line else 0
+                line_end = newlines[line] if line < len(newlines) else len(text)
+
+                # A match that ran past the newline (e.g. `\s*`) only counts if the rule also matches inside the line
+                if match.end() <= line_end or rule.search(text, start, line_end):
+                    found.append((line, index, line_start, line_end))
+                # One finding per (line, rule): continue on the next line
+                pos = line_end + 1
+
+        found.sort()
+        return [(line + 1, self.labels[index], text[line_start:line_end].strip())
+                for line, index, line_start, line_end in found]
+
+
+# Compiled once per process
+ENGINE = PatternEngine(PATTERNS, PREFILTER)
+
+
+@dataclass(frozen=True)
+class Finding:
+    """One potential secret: where it is and which pattern matched."""
+    file: str
+    line_number: int
+    type: str
+    content: str
+
+    def to_dict(self):
+        return asdict(self)
+
+
+# Files are read in blocks of this many characters, so memory stays flat on huge files
+CHUNK_CHARS = 1 << 20
+# A NUL byte in the first block marks the file as binary (same heuristic as git)
+BINARY_SNIFF_BYTES = 8192
+
+
+def _iter_line_blocks(f, chunk_chars=CHUNK_CHARS):
+    """
+    Yields blocks of text that always end on a line boundary.
+    The unfinished last line of each read is carried over into the next block,
+    so a match can never be split across two blocks.
+    """
+    carry = ""
+    for block in iter(lambda: f.read(chunk_chars), ""):
+        block = carry + block
+        cut = block.rfind("\n") + 1
+        carry = block[cut:]
+        if cut:
+            yield block[:cut]
+    if carry:
+        yield carry
+
+def iter_file_findings(filepath, engine=ENGINE):
+    """
+    Scans one file block by block, yielding each Finding as soon as its block
+    is scanned (memory stays flat however many hits a file has).
+    Binary files yield nothing. Raises if the file can't be read as UTF-8 text.
+    """
+    with open(filepath, "rb") as raw:
+        if b"\0" in raw.read(BINARY_SNIFF_BYTES):
+            return
+        raw.seek(0)
+
+        line_offset = 0
+        with io.TextIOWrapper(raw, encoding="utf-8") as f:
+            for block in _iter_line_blocks(f):
+                for line_num, label, content in engine.scan_text(block):
+                    yield Finding(filepath, line_offset + line_num, label, content)
+                line_offset += block.count("\n")
+
+def scan_file(filepath, engine=ENGINE):
+    """All findings of one file as a list (see iter_file_findings)."""
+    return list(iter_file_findings(filepath, engine))
+
+def _iter_file_findings_or_skip(filepath):
+    """Files we can't read (like images) stop yielding at the first unreadable block."""
+    try:
+        yield from iter_file_findings(filepath)
+    except Exception:
+        return
+
+def _scan_file_or_skip(filepath):
+    """Worker-safe wrapper: a list, so it can be sent back from a worker process."""
+    return list(_iter_file_findings_or_skip(filepath))
+
+def file_digest(filepath):
+    """SHA-256 of the raw file bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def ruleset_hash(patterns=PATTERNS):
+    """Fingerprint of the rules; any change to PATTERNS invalidates the cache."""
+    return hashlib.sha256(json.dumps(patterns, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ScanCache:
+    """
+    Persistent per-file findings, stored as JSON.
+    Entries are keyed by file path and hold mtime + size (fast path) and the
+    content hash (slow path). The whole cache is dropped when the ruleset changes.
+    """
+
+    def __init__(self, path, patterns=PATTERNS):
+        self.path = path
+        self.ruleset = ruleset_hash(patterns)
+        self.entries = {}
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("ruleset") == self.ruleset:
+                self.entries = data.get("files", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def save(self, entries):
+        self.entries = entries
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ruleset": self.ruleset, "files": entries}, f)
+        # Atomic swap, so an interrupted run never leaves a half-written cache
+        os.replace(tmp_path, self.path)
+
+
+def _scan_with_cache(job):
+    """Returns a fresh cache entry for one file, reusing the cached findings when possible."""
+    filepath, cached = job
+    try:
+        stat = os.stat(filepath)
+        if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached
+
+        digest = file_digest(filepath)
+    except OSError:
+        return {"mtime_ns": 0, "size": -1, "sha256": "", "findings": []}
+
+    if cached and cached["sha256"] == digest:
+        # Touched but unchanged (e.g. after a git checkout)
+        findings = cached["findings"]
+    else:
+        findings = [finding.to_dict() for finding in _scan_file_or_skip(filepath)]
+
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest, "findings": findings}
+
+# Directories that never hold source-code secrets; pruned before we descend into them.
+# Names like build/, dist/ or target/ are NOT listed: they often hold hand-written
+# deploy scripts, so they are only pruned when the .gitignore says so.
+DEFAULT_IGNORE_DIRS = {
+    ".git", ".hg", ".svn", "__pycache__", "node_modules", "bower_components",
+    "venv", ".venv", ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".gradle", ".idea"
+}
+# Extensions that can't contain readable secrets (media, archives, compiled code)
+DEFAULT_EXCLUDE_EXTS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".svgz", ".pdf",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".tar", ".jar", ".war", ".whl",
+    ".so", ".dll", ".dylib", ".exe", ".o", ".a", ".class", ".pyc", ".pyo",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".mov", ".avi", ".wav"
+}
+DEFAULT_MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+
+
+def _glob_to_regex(pattern):
+    """Translates one .gitignore glob into a regex over '/'-separated paths."""
+    regex, i = "", 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            chars = pattern[i + 1:end]
+            regex += "[" + ("^" + chars[1:] if chars.startswith("!") else chars) + "]"
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+class IgnoreRules:
+    """
+    A small .gitignore-style matcher.
+    Supports comments, `!` negation, trailing `/` (directories only) and
+    anchoring (a pattern containing `/` is relative to the scan root).
+    Like git, the last matching rule wins.
+    """
+
+    def __init__(self, patterns=()):
+        self.rules = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    @classmethod
+    def from_file(cls, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(f.read().splitlines())
+        except (OSError, UnicodeDecodeError):
+            return cls()
+
+    def add(self, pattern):
+        pattern = pattern.rstrip()
+        if not pattern or pattern.startswith("#"):
+            return
+
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        regex = _glob_to_regex(pattern.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+
+        self.rules.append((re.compile(regex), negate, dir_only))
+
+    def match(self, relpath, is_dir=False):
+        ignored = False
+        for regex, negate, dir_only in self.rules:
+            if (is_dir or not dir_only) and regex.fullmatch(relpath):
+                ignored = not negate
+        return ignored
+
+
+def _normalize_exts(exts):
+    return {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in exts}
+
+
+class FileFilter:
+    """
+    Decides which directories the walker descends into and which files it scans.
+    Directory rules are applied before descending, so ignored trees are never listed.
+    """
+
+    def __init__(self, ignore=None, ignore_dirs=DEFAULT_IGNORE_DIRS, max_file_size=DEFAULT_MAX_FILE_SIZE,
+                 include_exts=(), exclude_exts=DEFAULT_EXCLUDE_EXTS):
+        self.ignore = ignore or IgnoreRules()
+        self.ignore_dirs = set(ignore_dirs)
+        self.max_file_size = max_file_size
+        self.include_exts = _normalize_exts(include_exts)
+        self.exclude_exts = _normalize_exts(exclude_exts)
+
+    @classmethod
+    def for_directory(cls, directory, excludes=(), **options):
+        """Honors the `.gitignore` at the scan root plus any extra exclude patterns."""
+        ignore = IgnoreRules.from_file(os.path.join(directory, ".gitignore"))
+        for pattern in excludes:
+            ignore.add(pattern)
+        return cls(ignore=ignore, **options)
+
+    def allows_dir(self, name, relpath):
+        return name not in self.ignore_dirs and not self.ignore.match(relpath, is_dir=True)
+
+    def allows_file(self, name, relpath, size):
+        # Dotfiles like `.env` have no extension, so match them by name
+        ext = os.path.splitext(name)[1].lower() or name.lower()
+        if self.include_exts and ext not in self.include_exts:
+            return False
+        if ext in self.exclude_exts:
+            return False
+        if self.max_file_size and size > self.max_file_size:
+            return False
+        return not self.ignore.match(relpath)
+
+    def allows_path(self, relpath, size):
+        """Checks a root-relative file path, including every parent directory."""
+        parts = relpath.split("/")
+        for depth in range(1, len(parts)):
+            if not self.allows_dir(parts[depth - 1], "/".join(parts[:depth])):
+                return False
+        return self.allows_file(parts[-1], relpath, size)
+
+
+def iter_files(directory, file_filter=None):
+    """
+    Yields every scannable file under `directory`, depth-first in name order.
+    Built on os.scandir: ignored directories are pruned before descending.
+    """
+    if file_filter is None:
+        file_filter = FileFilter.for_directory(directory)
+
+    stack = [(directory, "")]
+    while stack:
+        path, rel_dir = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            relpath = f"{rel_dir}{entry.name}"
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                    
-                for line_num, line in enumerate(lines, 1):
-                    for label, pattern in PATTERNS.items():
-                        if re.search(pattern, line):
-                            results.append({
-                                "file": filepath,
-                                "line_number": line_num,
-                                "type": label,
-                                "content": line.strip() 
-                            })
-            except Exception as e:
-                # Ignore files we can't read (like images)
+                if entry.is_dir(follow_symlinks=False):
+                    if file_filter.allows_dir(entry.name, relpath):
+                        subdirs.append((entry.path, relpath + "/"))
+                elif entry.is_file() and file_filter.allows_file(entry.name, relpath, entry.stat().st_size):
+                    yield entry.path
+            except OSError:
                 continue
-                
-    return results
+
+        # Reversed so the stack pops subdirectories in name order
+        stack.extend(reversed(subdirs))
+
+def changed_files(directory, ref, file_filter=None):
+    """Files under `directory` that differ from the git `ref`, plus untracked files."""
+    if file_filter is None:
+        file_filter = FileFilter.for_directory(directory)
+
+    def git(*args):
+        result = subprocess.run(
+            ["git", "-C", directory, *args],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return [path for path in result.stdout.split("\0") if path]
+
+    changed = set(git("diff", "--name-only", "--relative", "--diff-filter=d", "-z", ref, "--"))
+    changed.update(git("ls-files", "--others", "--exclude-standard", "-z"))
+
+    filepaths = []
+    for relpath in sorted(changed):
+        filepath = os.path.join(directory, relpath)
+        if os.path.isfile(filepath) and file_filter.allows_path(relpath, os.path.getsize(filepath)):
+            filepaths.append(filepath)
+    return filepaths
+
+def _map_in_order(worker, items, jobs):
+    """Runs `worker` over `items`, yielding results in input order."""
+    if jobs > 1 and len(items) > 1:
+        # Small chunks keep every worker busy even when a few files are huge
+        chunksize = max(1, min(64, len(items) // (jobs * 8)))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            yield from pool.map(worker, items, chunksize=chunksize)
+    else:
+        yield from map(worker, items)
+
+def finding_fingerprint(finding, directory):
+    """
+    Stable ID for a finding, used by baselines and SARIF.
+    Built from the root-relative path, the type and the normalized line, but
+    not the line number, so a finding survives code moving up or down.
+    """
+    relpath = os.path.relpath(finding.file, directory).replace(os.sep, "/")
+    normalized = " ".join(finding.content.split())
+    return hashlib.sha256(f"{relpath}\0{finding.type}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class Baseline:
+    """A hashed index of known/accepted finding fingerprints."""
+
+    def __init__(self, fingerprints=()):
+        self.fingerprints = set(fingerprints)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f).get("fingerprints", []))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprints": sorted(self.fingerprints)}, f, indent=2)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.fingerprints
+
+    def add(self, fingerprint):
+        self.fingerprints.add(fingerprint)
+
+
+def _scan_findings(directory, jobs, cache, since, file_filter):
+    if since:
+        filepaths = changed_files(directory, since, file_filter)
+    else:
+        filepaths = list(iter_files(directory, file_filter))
+
+    if cache is None:
+        if jobs > 1 and len(filepaths) > 1:
+            # Workers send back one list per file
+            for findings in _map_in_order(_scan_file_or_skip, filepaths, jobs):
+                yield from findings
+        else:
+            # Serial: every finding is yielded as soon as its block is scanned
+            for filepath in filepaths:
+                yield from _iter_file_findings_or_skip(filepath)
+        return
+
+    # A partial (--since) scan keeps the entries of files it didn't look at
+    entries = dict(cache.entries) if since else {}
+    jobs_list = [(filepath, cache.entries.get(filepath)) for filepath in filepaths]
+    for filepath, entry in zip(filepaths, _map_in_order(_scan_with_cache, jobs_list, jobs)):
+        entries[filepath] = entry
+        for finding in entry["findings"]:
+            yield Finding(**finding)
+
+    cache.save(entries)
+
+def iter_findings(directory, jobs=1, cache=None, since=None, file_filter=None, baseline=None):
+    """
+    Yields a Finding for every match under `directory`, as soon as each file is scanned.
+    This is the in-process API; the CLI below is a thin JSON wrapper around it.
+    With jobs > 1 the files are spread over a process pool; results still
+    arrive in walk order, so the output is identical to a serial run.
+    `cache` (a ScanCache) reuses findings for unchanged files, and `since`
+    (a git ref) limits the scan to files changed since that ref.
+    `file_filter` (a FileFilter) defaults to the root `.gitignore` plus the built-in ignore lists.
+    `baseline` (a Baseline) suppresses known findings, so only new ones are yielded.
+    """
+    findings = _scan_findings(directory, jobs, cache, since, file_filter)
+    if baseline is None:
+        yield from findings
+        return
+
+    for finding in findings:
+        if finding_fingerprint(finding, directory) not in baseline:
+            yield finding
+
+def to_sarif(findings, directory):
+    """Builds a SARIF 2.1.0 log. The matched line is left out so secrets don't leak into CI."""
+    rules = [
+        {"id": label.lower().replace(" ", "-"), "name": label.replace(" ", ""),
+         "shortDescription": {"text": f"Potential hardcoded {label}"}}
+        for label in PATTERNS
+    ]
+    results = []
+    for finding in findings:
+        results.append({
+            "ruleId": finding.type.lower().replace(" ", "-"),
+            "level": "error",
+            "message": {"text": f"Potential hardcoded {finding.type}."},
+            "locations": [{
+                "physicalLocation": {
+                    "artifactLocation": {"uri": os.path.relpath(finding.file, directory).replace(os.sep, "/")},
+                    "region": {"startLine": finding.line_number}
+                }
+            }],
+            "partialFingerprints": {"secretsSniffer/v1": finding_fingerprint(finding, directory)}
+        })
+
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{"tool": {"driver": {"name": "secrets-sniffer", "rules": rules}}, "results": results}]
+    }
+
+def scan_directory(directory, **options):
+    """Scans every file under `directory` and returns all Findings as a list."""
+    return list(iter_findings(directory, **options))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find potential secrets with regex.")
     # Default to scanning the dummy_project folder if no arg provided
-    target_dir = "../dummy_project"
-    
-    if len(sys.argv) > 1:
-        target_dir = sys.argv[1]
-        
+    parser.add_argument("directory", nargs="?", default="../dummy_project")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes to scan with (0 = one per CPU core).")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="Scan cache file; unchanged files reuse their cached findings.")
+    parser.add_argument("--since", metavar="GIT_REF",
+                        help="Only scan files changed since this git ref (plus untracked files).")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="Extra .gitignore-style pattern to skip (repeatable).")
+    parser.add_argument("--no-default-ignores", action="store_true",
+                        help="Also scan VCS, dependency and cache folders (node_modules, .venv, ...). "
+                             "Slower, but nothing is skipped unless .gitignore or --exclude says so.")
+    parser.add_argument("--max-file-size", type=int, default=DEFAULT_MAX_FILE_SIZE, metavar="BYTES",
+                        help="Skip files larger than this (0 = no limit).")
+    parser.add_argument("--include-ext", default="", metavar="EXTS",
+                        help="Comma-separated allowlist of extensions, e.g. py,js,.env")
+    parser.add_argument("--exclude-ext", default="", metavar="EXTS",
+                        help="Comma-separated extensions to skip on top of the built-in list.")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="Baseline of accepted findings; only new findings are reported.")
+    parser.add_argument("--write-baseline", metavar="PATH",
+                        help="Save the fingerprints of everything reported (plus --baseline) as a new baseline.")
+    parser.add_argument("--format", choices=["json", "ndjson", "sarif"], default="json",
+                        help="ndjson streams one finding per line as soon as it is found.")
+    args = parser.parse_args()
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    cache = ScanCache(args.cache) if args.cache else None
+    file_filter = FileFilter.for_directory(
+        args.directory,
+        excludes=args.exclude,
+        ignore_dirs=() if args.no_default_ignores else DEFAULT_IGNORE_DIRS,
+        max_file_size=args.max_file_size,
+        include_exts=[ext for ext in args.include_ext.split(",") if ext],
+        exclude_exts=DEFAULT_EXCLUDE_EXTS | {ext for ext in args.exclude_ext.split(",") if ext}
+    )
+
     # NOTE: We removed the print("Scanning...") line here
     # so the output is PURE JSON for the Agent to read.
-    
-    matches = scan_directory(target_dir)
-    print(json.dumps(matches, indent=2))
\ No newline at end of file
+
+    baseline = Baseline.load(args.baseline) if args.baseline else None
+    findings = iter_findings(args.directory, jobs=jobs, cache=cache, since=args.since,
+                             file_filter=file_filter, baseline=baseline)
+
+    if args.write_baseline:
+        new_baseline = Baseline(baseline.fingerprints if baseline else ())
+
+        def record(findings):
+            for finding in findings:
+                new_baseline.add(finding_fingerprint(finding, args.directory))
+                yield finding
+
+        findings = record(findings)
+
+    if args.format == "ndjson":
+        for finding in findings:
+            sys.stdout.write(json.dumps(finding.to_dict()) + "\n")
+            sys.stdout.flush()
+    elif args.format == "sarif":
+        print(json.dumps(to_sarif(findings, args.directory), indent=2))
+    else:
+        print(json.dumps([finding.to_dict() for finding in findings], indent=2))
+
+    if args.write_baseline:
+        new_baseline.save(args.write_baseline)
@@ -1,7 +1,9 @@
 import os
 import sys
+import io
 import base64
 import json
+from PIL import Image
 from openai import OpenAI
 from dotenv import load_dotenv
 
@@ -9,10 +11,25 @@ from dotenv import load_dotenv
 load_dotenv("../../.env") # Looks for .env in the root folder
 client = OpenAI()
 
-def encode_image(image_path):
-    """Encodes an image to base64 so GPT-4o can see it."""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+def encode_image(image_path, quality=85):
+    """
+    Encodes an image to base64 so GPT-4o can see it.
+    It is first shrunk to what GPT-4o actually looks at ("high" detail:
+    within 2048px, short side 768px) and re-encoded as a real JPEG.
+    """
+    with Image.open(image_path) as image:
+        image = image.convert("RGBA")
+        scale = min(1.0, 2048 / max(image.size), 768 / min(image.size))
+        if scale < 1.0:
+            image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+
+        # JPEG has no transparency: flatten onto white
+        flat = Image.new("RGB", image.size, (255, 255, 255))
+        flat.paste(image, mask=image.split()[-1])
+
+        buffer = io.BytesIO()
+        flat.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
 
 def read_design_system():
     """Reads the strict design rules."""
@@ -56,7 +73,8 @@ def convert_ui(image_path, output_filename="index.html"):
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
+                            "url": f"data:image/jpeg;base64,{base64_image}",
+                            "detail": "high"
                         },
                     },
                 ],
@@ -0,0 +1,263 @@
+"""
+Tutor benchmark: loads the fixture transcripts into a temporary ChromaDB,
+replays the fixture questions through AITutor and reports retrieval quality
+(recall@k, MRR), per-stage latency (embed, query, generate) and tokens per answer.
+
+    python benchmarks/bench_retrieval.py --chunk-tokens 128 --budget 800
+
+Runs fully offline by default (hashing embeddings, stub LLM, character chunker).
+Use --chunker token (needs the tiktoken encoding, see TIKTOKEN_CACHE_DIR) and
+--embeddings config / --llm openai to measure the real backends.
+Results are written as JSON under benchmarks/results/ so runs can be compared over time.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import chromadb  # noqa: E402
+from colorama import init  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.cache import EmbeddingCache  # noqa: E402
+from src.embeddings import HashingEmbeddingProvider, get_embedding_provider  # noqa: E402
+
+RECALL_AT = (1, 3, 5)
+
+
+class StubChatClient:
+    """
+    Stands in for OpenAI().chat: answers with the first sentence of the context
+    after a fixed delay, and reports token usage (~4 characters per token).
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        time.sleep(self.latency)
+        prompt = "\n".join(message["content"] for message in messages)
+        context = prompt.split("--- CONTEXT FROM VIDEO ---")[-1].strip()
+        answer = re.split(r"(?<=[.!?])\s", context, maxsplit=1)[0]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(answer) // 4)
+        )
+
+
+class UsageRecorder:
+    """Wraps a chat client and keeps the token usage of the last completion."""
+
+    def __init__(self, client):
+        self.client = client
+        self.last_usage = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        response = self.client.chat.completions.create(**kwargs)
+        self.last_usage = response.usage
+        return response
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def load_fixtures():
+    with open(os.path.join(FIXTURES_DIR, "questions.json"), "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    transcripts = {}
+    transcripts_dir = os.path.join(FIXTURES_DIR, "transcripts")
+    for name in sorted(os.listdir(transcripts_dir)):
+        with open(os.path.join(transcripts_dir, name), "r", encoding="utf-8") as f:
+            transcripts[os.path.splitext(name)[0]] = f.read()
+    return transcripts, questions
+
+def build_store(tmp_dir, transcripts, embedding_provider):
+    """Ingests the fixture transcripts; returns (client, {chunk id: (video, text)})."""
+    from src.ingest import KnowledgeBase
+
+    client = chromadb.PersistentClient(path=os.path.join(tmp_dir, "chroma"))
+    kb = KnowledgeBase(
+        client=client,
+        embedding_provider=embedding_provider,
+        embedding_cache=EmbeddingCache(os.path.join(tmp_dir, "embedding_cache.sqlite"))
+    )
+
+    chunks = {}
+    for vid, raw_vtt in transcripts.items():
+        records = kb.build_chunks(f"https://www.youtube.com/watch?v={vid}", kb.clean_subs(raw_vtt))
+        kb.save_chunks(kb.embed_chunks(records))
+        chunks.update({record["id"]: (vid, normalize(record["document"])) for record in records})
+    return client, chunks
+
+def percentile(values, p):
+    """Nearest-rank percentile, in milliseconds."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return round(ordered[index] * 1000, 2)
+
+def replay(tutor, questions, chunks, llm, repeat):
+    """Asks every question `repeat` times, timing each stage separately."""
+    timings = {"embed": [], "query": [], "generate": []}
+    per_question = []
+
+    for item in questions:
+        relevant = {chunk_id for chunk_id, (vid, text) in chunks.items()
+                    if vid == item["video"] and normalize(item["answer"]) in text}
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            embedding = tutor.embed_query(item["question"])
+            embedded = time.perf_counter()
+            retrieved = tutor.retrieve(item["question"], embedding)
+            queried = time.perf_counter()
+            tutor.generate(item["question"], retrieved["documents"])
+            generated = time.perf_counter()
+
+            timings["embed"].append(embedded - start)
+            timings["query"].append(queried - embedded)
+            timings["generate"].append(generated - queried)
+
+        # Quality is deterministic, so it is scored on the last round only
+        ranks = [rank for rank, chunk_id in enumerate(retrieved["ids"], 1) if chunk_id in relevant]
+        per_question.append({
+            "question": item["question"],
+            "relevant_chunks": len(relevant),
+            "first_relevant_rank": ranks[0] if ranks else None,
+            "context_chunks": len(retrieved["ids"]),
+            "context_tokens": sum((metadata or {}).get("tokens", 0) for metadata in retrieved["metadatas"]),
+            "prompt_tokens": llm.last_usage.prompt_tokens if llm.last_usage else None,
+            "completion_tokens": llm.last_usage.completion_tokens if llm.last_usage else None,
+            "recall": {k: (len(relevant & set(retrieved["ids"][:k])) / len(relevant)) if relevant else 0.0
+                       for k in RECALL_AT}
+        })
+    return timings, per_question
+
+def summarize(timings, per_question):
+    n = len(per_question)
+
+    def mean(key):
+        values = [item[key] for item in per_question if item[key] is not None]
+        return round(sum(values) / len(values), 1) if values else None
+
+    return {
+        "questions": n,
+        **{f"recall@{k}": round(sum(item["recall"][k] for item in per_question) / n, 4) for k in RECALL_AT},
+        "mrr": round(sum(1 / item["first_relevant_rank"] for item in per_question
+                         if item["first_relevant_rank"]) / n, 4),
+        "latency_ms": {stage: {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+                       for stage, values in timings.items()},
+        "context_chunks_per_answer": mean("context_chunks"),
+        "context_tokens_per_answer": mean("context_tokens"),
+        "prompt_tokens_per_answer": mean("prompt_tokens"),
+        "completion_tokens_per_answer": mean("completion_tokens"),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "-C", BENCH_DIR, "rev-parse", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tutor's retrieval quality and latency.")
+    parser.add_argument("--embeddings", choices=["hashing", "config"], default="hashing",
+                        help="'hashing' is offline; 'config' uses EMBEDDING_PROVIDER from Config.")
+    parser.add_argument("--llm", choices=["stub", "openai"], default="stub")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="Seconds the stub LLM sleeps per answer.")
+    parser.add_argument("--chunker", choices=["token", "character"], default="character",
+                        help="'character' is offline; 'token' needs the tiktoken encoding.")
+    parser.add_argument("--chunk-tokens", type=int, default=settings.CHUNK_TOKENS)
+    parser.add_argument("--chunk-overlap", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--chunk-chars", type=int, default=settings.CHUNK_SIZE_CHARS)
+    parser.add_argument("--candidates", type=int, default=settings.RETRIEVAL_CANDIDATES)
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET,
+                        help="Context token budget per answer.")
+    parser.add_argument("--mmr-lambda", type=float, default=settings.MMR_LAMBDA)
+    parser.add_argument("--repeat", type=int, default=5, help="Rounds per question, for latency percentiles.")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/retrieval-<timestamp>.json).")
+    args = parser.parse_args()
+
+    init(autoreset=True)
+    if args.chunker == "token":
+        try:
+            import tiktoken
+            tiktoken.get_encoding(settings.TOKENIZER_ENCODING)
+        except Exception as e:
+            parser.error(f"--chunker token could not load the '{settings.TOKENIZER_ENCODING}' encoding ({e}). "
+                         "Download it once with network access, or point TIKTOKEN_CACHE_DIR at a folder "
+                         "that has it, or use --chunker character.")
+    # The tutor and ingest modules read these when they build their chunker/retriever
+    settings.CHUNKER = args.chunker
+    settings.CHUNK_TOKENS = args.chunk_tokens
+    settings.CHUNK_OVERLAP_TOKENS = args.chunk_overlap
+    settings.CHUNK_SIZE_CHARS = args.chunk_chars
+    settings.RETRIEVAL_CANDIDATES = args.candidates
+    settings.CONTEXT_TOKEN_BUDGET = args.budget
+    settings.MMR_LAMBDA = args.mmr_lambda
+
+    from src.tutor import AITutor
+
+    embedding_provider = (HashingEmbeddingProvider(settings.HASHING_DIMENSIONS)
+                          if args.embeddings == "hashing" else get_embedding_provider())
+    if args.llm == "stub":
+        llm = UsageRecorder(StubChatClient(args.llm_latency))
+    else:
+        from openai import OpenAI
+        llm = UsageRecorder(OpenAI(api_key=settings.OPENAI_API_KEY))
+
+    transcripts, questions = load_fixtures()
+
+    with tempfile.TemporaryDirectory(prefix="tutor_bench_") as tmp_dir:
+        print(f"🏗️  Ingesting {len(transcripts)} fixture transcripts ({embedding_provider.name})...")
+        client, chunks = build_store(tmp_dir, transcripts, embedding_provider)
+        print(f"   -> {len(chunks)} chunks.")
+
+        # Caches off: every round measures the real work (ask_stream is not benchmarked,
+        # so no async client is needed)
+        tutor = AITutor(client=client, embedding_provider=embedding_provider,
+                        ai_client=llm, async_ai_client=object(), use_cache=False)
+
+        print(f"⏱️  Replaying {len(questions)} questions x {args.repeat}...")
+        timings, per_question = replay(tutor, questions, chunks, llm, args.repeat)
+
+    summary = summarize(timings, per_question)
+    print("   -> " + ", ".join(f"recall@{k} {summary[f'recall@{k}']:.2%}" for k in RECALL_AT)
+          + f", MRR {summary['mrr']:.3f}")
+    for stage, values in summary["latency_ms"].items():
+        print(f"   -> {stage:<8} p50 {values['p50']} ms, p95 {values['p95']} ms")
+    print(f"   -> {summary['context_chunks_per_answer']} chunks / "
+          f"{summary['context_tokens_per_answer']} context tokens per answer")
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "embedding_model": embedding_provider.name,
+        "summary": summary,
+        "questions": per_question
+    }
+
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"retrieval-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Results saved to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+import numpy as np
+
+
+def text_hash(text: str, namespace: str = "") -> str:
+    """Content address for a piece of text (optionally scoped, e.g. by model name)."""
+    return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embeddings keyed by (model, text hash), stored in SQLite.
+    Identical chunks are never embedded twice, across runs and videos.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def get_many(self, keys: list) -> dict:
+        found = {}
+        with self._lock:
+            # SQLite caps the number of bound parameters, so look up in slices
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: dict):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items.items()]
+            )
+            self._db.commit()
+
+
+class CachedEmbeddingFunction:
+    """
+    Wraps an embedding function: cached texts are served from disk and only
+    the misses (deduplicated) are sent to the real model.
+    """
+
+    def __init__(self, embedding_function, cache: EmbeddingCache, model_name: str):
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self.model_name = model_name
+
+    def __call__(self, input: list) -> list:
+        keys = [text_hash(text, self.model_name) for text in input]
+        found = self.cache.get_many(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, input):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            new = {key: list(vector) for key, vector in zip(missing, vectors)}
+            self.cache.put_many(new)
+            found.update(new)
+
+        return [found[key] for key in keys]
+
+
+class SQLiteCache:
+    """
+    A JSON key/value cache persisted in SQLite, with TTL expiry and LRU eviction.
+    Several caches can share one file; each uses its own `namespace`.
+    """
+
+    def __init__(self, path, namespace: str, max_entries: int = 1000, ttl_seconds: float = 86400):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT, key TEXT, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._db.commit()
+                return None
+            # Touch the entry so LRU eviction keeps it
+            self._db.execute(
+                "UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+            self._db.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now, now)
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        self._db.execute(
+            "DELETE FROM cache WHERE namespace = ? AND created < ?",
+            (self.namespace, now - self.ttl_seconds)
+        )
+        # Drop the least recently used entries beyond the size limit
+        self._db.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+
+class SemanticCache:
+    """
+    Answers keyed by query embedding: a new question whose embedding is
+    within `threshold` cosine similarity of a cached one reuses its answer.
+    Vectors live in SQLite and are mirrored in one NumPy matrix for lookups.
+    Entries are scoped by `namespace` (the embedding model and collection), so
+    vectors from different models are never compared.
+    Same TTL + LRU eviction rules as SQLiteCache.
+    """
+
+    def __init__(self, path, namespace: str, threshold: float = 0.95, max_entries: int = 1000,
+                 ttl_seconds: float = 86400):
+        self.namespace = namespace
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(semantic)")]
+        if columns and "namespace" not in columns:
+            # Written before entries were scoped by model: unsafe to reuse, and only a cache
+            self._db.execute("DROP TABLE semantic")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS semantic ("
+            " namespace TEXT, key TEXT, vector BLOB NOT NULL, answer TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.commit()
+        self._keys, self._matrix = [], None
+
+    def _load(self):
+        """Rebuilds the in-memory matrix of unit vectors from SQLite."""
+        self._db.execute(
+            "DELETE FROM semantic WHERE namespace = ? AND created < ?",
+            (self.namespace, time.time() - self.ttl_seconds)
+        )
+        self._db.commit()
+        rows = self._db.execute("SELECT key, vector FROM semantic WHERE namespace = ?", (self.namespace,)).fetchall()
+        self._keys = [key for key, _ in rows]
+        if rows:
+            matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+            self._matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        else:
+            self._matrix = None
+
+    def lookup(self, embedding: list):
+        """Returns (answer, similarity) for the closest cached question, or None."""
+        with self._lock:
+            if self._matrix is None:
+                self._load()
+            if self._matrix is None:
+                return None
+
+            query = np.asarray(embedding, dtype=np.float32)
+            scores = self._matrix @ (query / np.linalg.norm(query))
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            row = self._db.execute(
+                "SELECT answer, created FROM semantic WHERE namespace = ? AND key = ?",
+                (self.namespace, self._keys[best])
+            ).fetchone()
+            if row is None or time.time() - row[1] > self.ttl_seconds:
+                self._matrix = None
+                return None
+            self._db.execute(
+                "UPDATE semantic SET accessed = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, self._keys[best])
+            )
+            self._db.commit()
+            return row[0], float(scores[best])
+
+    def add(self, key: str, embedding: list, answer: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO semantic (namespace, key, vector, answer, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, np.asarray(embedding, dtype=np.float32).tobytes(), answer, now, now)
+            )
+            self._db.execute(
+                "DELETE FROM semantic WHERE namespace = ? AND key IN ("
+                " SELECT key FROM semantic WHERE namespace = ? ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_entries)
+            )
+            self._db.commit()
+            # Reload lazily on the next lookup
+            self._matrix = None
@@ -0,0 +1,172 @@
+import re
+from dataclasses import dataclass
+import tiktoken
+from src.config import settings
+
+# A sentence ends at . ! or ? followed by whitespace
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Segment:
+    """A piece of transcript text with its timing in the video (seconds)."""
+    text: str
+    start: float
+    end: float
+
+
+@dataclass
+class Chunk:
+    """One knowledge chunk, ready to embed."""
+    text: str
+    start: float
+    end: float
+    token_count: int
+
+
+class Chunker:
+    """
+    Base class: turns timed transcript segments into chunks.
+    Subclasses decide where the boundaries go.
+    """
+
+    def split(self, segments: list) -> list:
+        raise NotImplementedError
+
+
+class CharacterChunker(Chunker):
+    """
+    The original strategy: fixed-size character windows, no overlap.
+    Kept for comparison; chunk timings come from the segments each window touches.
+    """
+
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = chunk_size
+
+    def split(self, segments: list) -> list:
+        text, starts = "", []
+        for segment in segments:
+            starts.append((len(text), segment))
+            text += segment.text + " "
+
+        chunks = []
+        for i in range(0, len(text), self.chunk_size):
+            touched = [seg for offset, seg in starts if i <= offset + len(seg.text) and offset < i + self.chunk_size]
+            window = text[i : i + self.chunk_size]
+            chunks.append(Chunk(
+                text=window,
+                start=touched[0].start if touched else 0.0,
+                end=touched[-1].end if touched else 0.0,
+                token_count=len(window) // 4
+            ))
+        return chunks
+
+
+class TokenChunker(Chunker):
+    """
+    Token-bounded chunks that respect sentence boundaries.
+    - Sentences are packed until `max_tokens` is reached.
+    - Each new chunk repeats the trailing sentences of the previous one, up to `overlap_tokens`.
+    - A sentence longer than `max_tokens` (e.g. unpunctuated auto-captions) is cut by tokens.
+    """
+
+    def __init__(self, max_tokens: int = 256, overlap_tokens: int = 32, encoding: str = "cl100k_base"):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def _sentences(self, segments: list) -> list:
+        """Merges segment pieces into (text, start, end, tokens) sentences."""
+        sentences = []
+        parts, start, end = [], None, None
+
+        def close():
+            nonlocal parts, start
+            if parts:
+                text = " ".join(parts)
+                sentences.extend(self._fit(text, start, end))
+            parts, start = [], None
+
+        for segment in segments:
+            pieces = [piece for piece in SENTENCE_END.split(segment.text.strip()) if piece]
+            for i, piece in enumerate(pieces):
+                if start is None:
+                    start = segment.start
+                parts.append(piece)
+                end = segment.end
+                # Every piece but the last one in a segment ends a sentence
+                if i < len(pieces) - 1 or piece[-1] in ".!?":
+                    close()
+        close()
+        return sentences
+
+    def _fit(self, text: str, start: float, end: float) -> list:
+        """Cuts an over-long sentence into max_tokens pieces, spreading its timing linearly."""
+        tokens = self.encoding.encode(text)
+        if len(tokens) <= self.max_tokens:
+            return [(text, start, end, len(tokens))]
+
+        pieces = []
+        step = self.max_tokens - self.overlap_tokens
+        duration = end - start
+        for i in range(0, len(tokens), step):
+            window = tokens[i : i + self.max_tokens]
+            pieces.append((
+                self.encoding.decode(window),
+                start + duration * i / len(tokens),
+                start + duration * min(i + len(window), len(tokens)) / len(tokens),
+                len(window)
+            ))
+            if i + self.max_tokens >= len(tokens):
+                break
+        return pieces
+
+    def split(self, segments: list) -> list:
+        chunks = []
+        current, used = [], 0
+
+        def emit():
+            chunks.append(Chunk(
+                text=" ".join(sentence[0] for sentence in current),
+                start=current[0][1],
+                end=current[-1][2],
+                token_count=used
+            ))
+
+        for sentence in self._sentences(segments):
+            tokens = sentence[3]
+            if current and used + tokens > self.max_tokens:
+                emit()
+                # Carry the tail of this chunk into the next one as overlap
+                overlap, overlap_used = [], 0
+                for previous in reversed(current):
+                    if overlap_used + previous[3] > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_used += previous[3]
+                # Never let the overlap push the next chunk past the budget
+                while overlap and overlap_used + tokens > self.max_tokens:
+                    overlap_used -= overlap.pop(0)[3]
+                current, used = overlap, overlap_used
+
+            current.append(sentence)
+            used += tokens
+
+        if current:
+            emit()
+        return chunks
+
+
+def get_chunker() -> Chunker:
+    """Builds the chunker selected in Config."""
+    if settings.CHUNKER == "character":
+        return CharacterChunker(settings.CHUNK_SIZE_CHARS)
+    if settings.CHUNKER == "token":
+        return TokenChunker(
+            max_tokens=settings.CHUNK_TOKENS,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+            encoding=settings.TOKENIZER_ENCODING
+        )
+    raise ValueError(f"Unknown chunker: {settings.CHUNKER}")
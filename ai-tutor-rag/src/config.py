@@ -8,13 +8,55 @@ class Config:
     # 1. Paths
     BASE_DIR = Path(__file__).resolve().parent.parent
     DB_PATH = BASE_DIR / "db" / "chroma_store" # Where the brain lives
+    EMBEDDING_CACHE_PATH = BASE_DIR / "db" / "embedding_cache.sqlite" # Embeddings by text hash
+    TUTOR_CACHE_PATH = BASE_DIR / "db" / "tutor_cache.sqlite" # Query embeddings + answers
     
     # 2. Database Settings
     COLLECTION_NAME = "ai_tutor_knowledge" # The 'Table' name in our DB
     
     # 3. Model Settings
+    # "openai" (API), "local" (sentence-transformers, offline) or "hashing" (offline, tests)
+    EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
     # We use this specific model because it is cheap and very accurate
     EMBEDDING_MODEL = "text-embedding-3-small" 
+    LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    LOCAL_EMBEDDING_BATCH_SIZE = 64
+    HASHING_DIMENSIONS = 512
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+    # 4. Chunking
+    CHUNKER = "token"                  # "token" (tiktoken, sentence-aware) or "character" (legacy)
+    CHUNK_TOKENS = 256                 # Max tokens per chunk
+    CHUNK_OVERLAP_TOKENS = 32          # Tokens repeated from the previous chunk
+    TOKENIZER_ENCODING = "cl100k_base" # The encoding text-embedding-3-* uses
+    CHUNK_SIZE_CHARS = 1000            # Only for the "character" chunker
+
+    # 5. Bulk Ingestion Pipeline
+    DOWNLOAD_WORKERS = 8        # Parallel yt-dlp downloads
+    PARSE_WORKERS = 2           # Transcript cleaning + chunking
+    EMBED_WORKERS = 2           # Concurrent embedding requests
+    EMBED_BATCH_SIZE = 100      # Chunks per embedding request
+    WRITE_BATCH_SIZE = 500      # Chunks per ChromaDB write
+    PIPELINE_QUEUE_SIZE = 16    # Bounded queues = backpressure between stages
+    PROGRESS_INTERVAL = 5.0     # Seconds between progress lines
+
+    # 6. Retrieval (BM25 + vector -> fusion -> MMR -> token budget)
+    RETRIEVAL_CANDIDATES = 20           # Chunks fetched from each index
+    CONTEXT_TOKEN_BUDGET = 1500         # Max context tokens sent to the LLM
+    MMR_LAMBDA = 0.7                    # 1.0 = pure relevance, lower = more diversity
+    DUPLICATE_THRESHOLD = 0.95          # Chunks this similar to a picked one are dropped
+    RRF_K = 60                          # Reciprocal Rank Fusion damping
+
+    # 7. Tutor Cache
+    QUERY_CACHE_MAX_ENTRIES = 10000     # Cached query embeddings
+    QUERY_CACHE_TTL = 7 * 24 * 3600     # Seconds
+    ANSWER_CACHE_MAX_ENTRIES = 2000     # Cached answers
+    ANSWER_CACHE_TTL = 24 * 3600        # Seconds; stale answers expire after a re-ingest
+    SEMANTIC_CACHE_THRESHOLD = 0.95     # Cosine similarity to reuse an answer (None = off)
+
+    # 8. Server (python -m src.server)
+    SERVER_HOST = "127.0.0.1"
+    SERVER_PORT = 8000
+    SERVER_MAX_STREAMS = 32             # Concurrent answers being generated
+
 settings = Config()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import re
+import zlib
+import numpy as np
+from openai import OpenAI
+from chromadb.api.types import EmbeddingFunction
+from src.config import settings
+
+# Collections created before the model was recorded were built with this one
+LEGACY_EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+class EmbeddingModelMismatch(ValueError):
+    """The collection was built with a different embedding model than the configured one."""
+
+
+class EmbeddingProvider:
+    """
+    Base class: turns a batch of texts into vectors.
+    `name` identifies the model; it is recorded on the collection and scopes the caches.
+    """
+
+    name = "base"
+
+    def embed(self, texts: list) -> list:
+        raise NotImplementedError
+
+    def __call__(self, input: list) -> list:
+        return self.embed(input)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API (one request per `batch_size` texts)."""
+
+    def __init__(self, model: str, api_key: str, batch_size: int = 2048):
+        self.name = model
+        self.client = OpenAI(api_key=api_key)
+        self.batch_size = batch_size
+
+    def embed(self, texts: list) -> list:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(model=self.name, input=texts[i : i + self.batch_size])
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return vectors
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Offline, dependency-free embeddings: word unigrams and bigrams are hashed
+    into a fixed number of buckets (signed, log-scaled, L2-normalized).
+    Much weaker than a trained model, but deterministic and instant;
+    meant for tests, benchmarks and air-gapped demos.
+    """
+
+    WORD = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def _features(self, text: str) -> list:
+        words = self.WORD.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: list) -> list:
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([row] * len(features))
+            # crc32 is stable across processes (unlike hash())
+            hashes.extend(zlib.crc32(feature.encode("utf-8")) for feature in features)
+
+        # One vectorized scatter-add for the whole batch
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), hashes % self.dimensions), signs)
+
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        return matrix.tolist()
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """Local CPU/GPU model via sentence-transformers (optional dependency)."""
+
+    def __init__(self, model: str, batch_size: int = 64, device: str = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(
+                "The 'local' embedding provider needs sentence-transformers: pip install sentence-transformers"
+            )
+        self.name = model
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model, device=device)
+
+    def embed(self, texts: list) -> list:
+        return self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True
+        ).tolist()
+
+
+class ChromaEmbeddingFunction(EmbeddingFunction):
+    """Lets ChromaDB call a provider (e.g. for query_texts)."""
+
+    def __init__(self, provider: EmbeddingProvider):
+        self.provider = provider
+
+    def __call__(self, input):
+        return self.provider.embed(list(input))
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Builds the embedding provider selected in Config."""
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return OpenAIEmbeddingProvider(settings.EMBEDDING_MODEL, settings.OPENAI_API_KEY)
+    if settings.EMBEDDING_PROVIDER == "local":
+        return SentenceTransformerProvider(settings.LOCAL_EMBEDDING_MODEL, batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE)
+    if settings.EMBEDDING_PROVIDER == "hashing":
+        return HashingEmbeddingProvider(settings.HASHING_DIMENSIONS)
+    raise ValueError(f"Unknown embedding provider: {settings.EMBEDDING_PROVIDER}")
+
+
+def open_collection(client, provider: EmbeddingProvider, name: str, create: bool = False):
+    """
+    Opens (or creates) the collection and checks it was built with `provider`.
+    New collections record the model in their metadata. Vectors from different
+    models are not comparable, so a mismatch raises instead of returning garbage.
+    """
+    embedding_function = ChromaEmbeddingFunction(provider)
+    if create:
+        collection = client.get_or_create_collection(
+            name=name,
+            embedding_function=embedding_function,
+            metadata={"embedding_model": provider.name}
+        )
+    else:
+        collection = client.get_collection(name=name, embedding_function=embedding_function)
+
+    metadata = dict(collection.metadata or {})
+    stored = metadata.get("embedding_model")
+    if stored is None:
+        # Older collection: empty ones adopt the provider, filled ones were built by OpenAI
+        stored = provider.name if collection.count() == 0 else LEGACY_EMBEDDING_MODEL
+        metadata["embedding_model"] = stored
+        collection.modify(metadata=metadata)
+
+    if stored != provider.name:
+        raise EmbeddingModelMismatch(
+            f"Collection '{name}' was built with '{stored}' but the configured model is '{provider.name}'. "
+            f"Switch EMBEDDING_PROVIDER back or re-ingest into a new COLLECTION_NAME."
+        )
+    return collection
@@ -1,71 +1,206 @@
+import io
 import os
+import time
 import glob
+import argparse
+import tempfile
+from urllib.parse import urlparse, parse_qs
 import webvtt
 import chromadb
 from yt_dlp import YoutubeDL
-from chromadb.utils import embedding_functions
 from src.config import settings
+from src.embeddings import get_embedding_provider, open_collection
+from src.cache import EmbeddingCache, CachedEmbeddingFunction, text_hash
+from src.chunking import get_chunker
+from src.transcript import Transcript, normalize_captions
+from src.pipeline import Pipeline, Stage, StageMetrics
+
+def video_id(url: str) -> str:
+    """
+    Stable ID for a video, the same in every process.
+    Uses the YouTube video ID when the URL has one, else a hash of the URL.
+    """
+    parsed = urlparse(url)
+    if "v" in parse_qs(parsed.query):
+        return parse_qs(parsed.query)["v"][0]
+
+    parts = [part for part in parsed.path.split("/") if part]
+    if parsed.netloc.endswith("youtu.be") and parts:
+        return parts[0]
+    if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+        return parts[1]
+    return text_hash(url)[:16]
 
 class KnowledgeBase:
     """
     Manages the Vector Database.
     Uses yt-dlp to robustly download transcripts when standard APIs fail.
+    The DB client, embedding provider and embedding cache default to Config and can be injected.
     """
-    
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path=str(settings.DB_PATH))
-        
-        openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=settings.OPENAI_API_KEY,
-            model_name=settings.EMBEDDING_MODEL
+
+    def __init__(self, client=None, embedding_provider=None, embedding_cache=None):
+        store = "injected client" if client else settings.DB_PATH
+        self.client = client or chromadb.PersistentClient(path=str(settings.DB_PATH))
+
+        # The provider (OpenAI, local model, ...) is chosen in Config and recorded on the collection
+        self.embedding_provider = embedding_provider or get_embedding_provider()
+        self.collection = open_collection(
+            self.client, self.embedding_provider, settings.COLLECTION_NAME, create=True
         )
-        
-        self.collection = self.client.get_or_create_collection(
-            name=settings.COLLECTION_NAME,
-            embedding_function=openai_ef
+
+        # Identical chunks are never embedded twice (across videos and runs)
+        self.cached_embedding_function = CachedEmbeddingFunction(
+            self.embedding_provider,
+            embedding_cache or EmbeddingCache(settings.EMBEDDING_CACHE_PATH),
+            model_name=self.embedding_provider.name
         )
-        print(f"💾 Connected to Knowledge Base: {settings.DB_PATH}")
+        self.chunker = get_chunker()
+        print(f"💾 Connected to Knowledge Base: {store}")
 
-    def download_and_clean_subs(self, url: str) -> str:
+    def download_subs(self, url: str) -> str:
         """
-        Uses yt-dlp to download subtitles, cleans them, and returns pure text.
+        Uses yt-dlp to fetch subtitles and returns the raw WebVTT text.
+        The track is read straight into memory, so concurrent jobs (threads
+        or processes) never share a file on disk.
         """
         print("   🚜 Starting yt-dlp (The Tank)...")
-        
-        # Configuration to download ONLY subs (no video)
+
+        # Configuration to fetch ONLY subs (no video)
         ydl_opts = {
             'skip_download': True,      # Don't download video
             'writeautomaticsub': True,  # Get auto-generated subs
             'writesubtitles': True,     # Get manual subs if exist
             'subtitleslangs': ['en'],   # English only
-            'outtmpl': 'temp_subs',     # Save as 'temp_subs'
+            'subtitlesformat': 'vtt',   # WebVTT, so timings survive
             'quiet': True,
         }
 
-        # 1. Download the .vtt file
         try:
             with YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+                # 1. Resolve the best English track (manual first, then auto) without writing anything
+                info = ydl.extract_info(url, download=False)
+                tracks = info.get('requested_subtitles') or {}
+                if not tracks:
+                    raise Exception("No subtitle file found! Video might not have captions.")
+
+                track = next(iter(tracks.values()))
+                if track.get('data'):
+                    return track['data']
+                if track.get('url'):
+                    # 2. Read the track into memory
+                    with ydl.urlopen(track['url']) as response:
+                        return response.read().decode('utf-8')
+
+                # 3. Fallback: let yt-dlp write the file into a private temp folder
+                return self._download_subs_to_temp_dir(url, ydl_opts)
         except Exception as e:
             raise Exception(f"yt-dlp failed: {e}")
 
-        # 2. Find the file (it adds extensions like .en.vtt)
-        vtt_files = glob.glob("temp_subs*.vtt")
-        if not vtt_files:
-            raise Exception("No subtitle file found! Video might not have captions.")
-        
-        vtt_path = vtt_files[0]
+    def _download_subs_to_temp_dir(self, url: str, ydl_opts: dict) -> str:
+        with tempfile.TemporaryDirectory(prefix="ai_tutor_subs_") as job_dir:
+            opts = dict(ydl_opts, outtmpl=os.path.join(job_dir, 'subs'))
+            with YoutubeDL(opts) as ydl:
+                ydl.download([url])
+
+            # yt-dlp adds extensions like .en.vtt
+            vtt_files = glob.glob(os.path.join(job_dir, "subs*.vtt"))
+            if not vtt_files:
+                raise Exception("No subtitle file found! Video might not have captions.")
+            with open(vtt_files[0], "r", encoding="utf-8") as f:
+                return f.read()
+
+    def clean_subs(self, raw_vtt: str) -> Transcript:
+        """
+        Parses the WebVTT buffer and returns a compact Transcript:
+        cue tags stripped, rolling auto-caption repeats collapsed, timings kept.
+        """
+        print("   🧹 Cleaning transcript...")
+        transcript = normalize_captions(
+            ("\n".join(caption.lines), caption.start_in_seconds, caption.end_in_seconds)
+            for caption in webvtt.read_buffer(io.StringIO(raw_vtt))
+        )
+        print(f"   🗜️  Collapsed {transcript.raw_words} caption words into {transcript.words}.")
+        return transcript
+
+    def download_and_clean_subs(self, url: str) -> Transcript:
+        """
+        Uses yt-dlp to download subtitles, cleans them, and returns a Transcript.
+        """
+        return self.clean_subs(self.download_subs(url))
+
+    def build_chunks(self, url: str, transcript: Transcript) -> list:
+        """
+        Splits a transcript into chunk records: {"id", "document", "metadata"}.
+        IDs are content-addressed (video ID + start time + text), so re-ingesting
+        the same video yields the same IDs in every process.
+        Each chunk keeps its start/end time, so answers can deep-link into the video.
+        """
+        records = []
+        vid = video_id(url)
+
+        for chunk in self.chunker.split(transcript.segments):
+            records.append({
+                "id": f"{vid}_{text_hash(chunk.text, f'{vid}:{chunk.start:.3f}')[:16]}",
+                "document": chunk.text,
+                "metadata": {
+                    "source": url,
+                    "type": "youtube",
+                    "video_id": vid,
+                    "start": round(chunk.start, 2),
+                    "end": round(chunk.end, 2),
+                    "tokens": chunk.token_count,
+                    "link": f"https://youtu.be/{vid}?t={int(chunk.start)}"
+                }
+            })
+        return records
+
+    def new_chunks(self, records: list) -> list:
+        """
+        Drops records whose ID is already stored, so unchanged videos cost nothing.
+        """
+        if not records:
+            return records
+        existing = set(self.collection.get(ids=[record["id"] for record in records], include=[])["ids"])
+        return [record for record in records if record["id"] not in existing]
+
+    def remove_stale_chunks(self, url: str, records: list) -> int:
+        """
+        Deletes the video's stored chunks that are not in `records` (the transcript
+        or the chunker changed), so old and new versions are never retrieved together.
+        Returns how many were removed.
+        """
+        current = {record["id"] for record in records}
+        stored = self.collection.get(where={"video_id": video_id(url)}, include=[])["ids"]
+        stale = [chunk_id for chunk_id in stored if chunk_id not in current]
+        if stale:
+            self.collection.delete(ids=stale)
+            print(f"   🗑️  Removed {len(stale)} outdated chunks.")
+        return len(stale)
 
-        # 3. Clean the text using WebVTT
-        print(f"   🧹 Cleaning transcript file: {vtt_path}")
-        clean_text = ""
-        for caption in webvtt.read(vtt_path):
-            clean_text += caption.text + " "
+    def embed_chunks(self, records: list) -> list:
+        """
+        Embeds a batch of chunk records in ONE request and attaches the vectors.
+        Texts already in the embedding cache are not sent again.
+        """
+        embeddings = self.cached_embedding_function([record["document"] for record in records])
+        for record, embedding in zip(records, embeddings):
+            record["embedding"] = embedding
+        return records
 
-        # 4. Cleanup (Delete the temp file)
-        os.remove(vtt_path)
-        
-        return clean_text
+    def save_chunks(self, records: list) -> list:
+        """
+        Writes a batch of (already embedded) chunk records to ChromaDB.
+        Duplicate IDs in the batch are written once (ChromaDB rejects the whole
+        batch otherwise), and upserting keeps a concurrent re-ingest harmless.
+        """
+        records = list({record["id"]: record for record in records}.values())
+        self.collection.upsert(
+            ids=[record["id"] for record in records],
+            documents=[record["document"] for record in records],
+            metadatas=[record["metadata"] for record in records],
+            embeddings=[record["embedding"] for record in records]
+        )
+        return records
 
     def ingest_youtube_video(self, url: str):
         """
@@ -75,40 +210,124 @@ class KnowledgeBase:
 
         try:
             # --- STEP A: EXTRACT ---
-            full_text = self.download_and_clean_subs(url)
-            print(f"   ✅ Extracted {len(full_text)} characters.")
+            transcript = self.download_and_clean_subs(url)
+            print(f"   ✅ Extracted {len(transcript.text)} characters.")
 
             # --- STEP B: TRANSFORM (Chunking) ---
-            chunk_size = 1000
-            chunks = []
-            ids = []
-            metadatas = []
-            
-            # Simple unique ID based on URL hash to prevent duplicates
-            video_hash = str(abs(hash(url)))
-            
-            for i in range(0, len(full_text), chunk_size):
-                chunk = full_text[i : i + chunk_size]
-                chunks.append(chunk)
-                ids.append(f"{video_hash}_chunk_{i}")
-                metadatas.append({"source": url, "type": "youtube"})
-            
-            print(f"   🔪 Split into {len(chunks)} knowledge chunks.")
+            records = self.build_chunks(url, transcript)
+            self.remove_stale_chunks(url, records)
+            new_records = self.new_chunks(records)
+            print(f"   🔪 Split into {len(records)} knowledge chunks ({len(new_records)} new).")
+
+            if not new_records:
+                print("   ⏭️  Already in the Knowledge Base. Nothing to do.")
+                return
 
             # --- STEP C: LOAD ---
             print("   🧠 Embedding and saving to ChromaDB...")
-            self.collection.add(
-                documents=chunks,
-                ids=ids,
-                metadatas=metadatas
-            )
+            for i in range(0, len(new_records), settings.EMBED_BATCH_SIZE):
+                self.save_chunks(self.embed_chunks(new_records[i : i + settings.EMBED_BATCH_SIZE]))
             print("   🎉 Knowledge Saved Successfully!")
 
         except Exception as e:
             print(f"❌ Error ingesting video: {e}")
 
+    def resolve_urls(self, sources, metrics=None):
+        """
+        Expands playlist URLs into video URLs (flat extraction, nothing is downloaded).
+        Plain video URLs are passed through untouched.
+        Each video is yielded once, however many times (or URL forms) it appears.
+        A playlist that can't be read is logged and counted in `metrics.errors`; the
+        remaining sources still run.
+        """
+        metrics = metrics or StageMetrics("resolve")
+        seen = set()
+
+        def first_time(url):
+            vid = video_id(url)
+            if vid in seen:
+                return False
+            seen.add(vid)
+            return True
+
+        with YoutubeDL({'extract_flat': 'in_playlist', 'quiet': True}) as ydl:
+            for source in sources:
+                metrics.items_in += 1
+                if "list=" not in source and "/playlist" not in source:
+                    if first_time(source):
+                        metrics.items_out += 1
+                        yield source
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    info = ydl.extract_info(source, download=False)
+                except Exception as e:
+                    metrics.errors += 1
+                    print(f"   ❌ [resolve] {source}: {e}")
+                    continue
+                finally:
+                    metrics.busy_seconds += time.perf_counter() - start
+
+                for entry in info.get('entries') or []:
+                    url = entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}"
+                    if first_time(url):
+                        metrics.items_out += 1
+                        yield url
+        metrics.finished_at = time.perf_counter()
+
+    def ingest_bulk(self, sources):
+        """
+        The Bulk ETL Pipeline, for playlists and long URL lists.
+        Download -> Parse -> Embed -> Save run as concurrent stages joined by
+        bounded queues: downloads use a thread pool, parsing overlaps with
+        them, and embeddings and ChromaDB writes are batched.
+        """
+        def download(urls):
+            return [(url, self.download_subs(url)) for url in urls]
+
+        def parse(items):
+            records = []
+            for url, raw_vtt in items:
+                video_records = self.build_chunks(url, self.clean_subs(raw_vtt))
+                self.remove_stale_chunks(url, video_records)
+                records.extend(self.new_chunks(video_records))
+            return records
+
+        pipeline = Pipeline([
+            Stage("download", download, workers=settings.DOWNLOAD_WORKERS,
+                  queue_size=settings.PIPELINE_QUEUE_SIZE),
+            Stage("parse", parse, workers=settings.PARSE_WORKERS,
+                  queue_size=settings.PIPELINE_QUEUE_SIZE),
+            Stage("embed", self.embed_chunks, workers=settings.EMBED_WORKERS,
+                  batch_size=settings.EMBED_BATCH_SIZE, queue_size=settings.PIPELINE_QUEUE_SIZE * 10),
+            Stage("save", self.save_chunks, batch_size=settings.WRITE_BATCH_SIZE,
+                  queue_size=settings.PIPELINE_QUEUE_SIZE * 10),
+        ], progress_interval=settings.PROGRESS_INTERVAL)
+
+        print(f"\n📚 Bulk ingesting {len(sources)} source(s)...")
+        resolved = StageMetrics("resolve")
+        metrics = [resolved] + pipeline.run(self.resolve_urls(sources, resolved))
+
+        print("   🏁 Pipeline finished:")
+        print(Pipeline.summary(metrics))
+        return metrics
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest YouTube videos into the Knowledge Base.")
+    parser.add_argument("sources", nargs="*", help="Video or playlist URLs.")
+    parser.add_argument("--file", help="Text file with one URL per line.")
+    args = parser.parse_args()
+
+    sources = list(args.sources)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            sources += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
     kb = KnowledgeBase()
-    # Test with the Prompt Engineering Course
-    TEST_URL = "https://www.youtube.com/watch?v=jC4v5AS4RIM" 
-    kb.ingest_youtube_video(TEST_URL)
\ No newline at end of file
+    if sources:
+        kb.ingest_bulk(sources)
+    else:
+        # Test with the Prompt Engineering Course
+        TEST_URL = "https://www.youtube.com/watch?v=jC4v5AS4RIM"
+        kb.ingest_youtube_video(TEST_URL)
@@ -0,0 +1,161 @@
+import time
+import queue
+import threading
+from dataclasses import dataclass, field
+
+# Marks the end of a stream; every stage forwards it once all its workers are done
+STOP = object()
+
+
+@dataclass
+class StageMetrics:
+    """Counters for one stage. `busy_seconds` is summed across workers."""
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float = None
+
+    def throughput(self):
+        """Items consumed per wall-clock second."""
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return self.items_in / elapsed if elapsed > 0 else 0.0
+
+
+class Stage:
+    """
+    One step of a Pipeline, run by `workers` threads.
+    `handler` gets a list of up to `batch_size` items and returns the items to pass on.
+    A partial batch is flushed when the inbox stays empty for `batch_wait` seconds
+    or when the stream ends, so small runs don't stall waiting for a full batch.
+    """
+
+    def __init__(self, name, handler, workers=1, batch_size=1, queue_size=100, batch_wait=0.5):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        # Bounded: a slow stage blocks the one before it (backpressure)
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.outbox = None
+        self.metrics = StageMetrics(name)
+        self._lock = threading.Lock()
+        self._running = workers
+
+    def _process(self, batch):
+        start = time.perf_counter()
+        try:
+            outputs = list(self.handler(batch))
+        except Exception as e:
+            with self._lock:
+                self.metrics.errors += len(batch)
+            print(f"   ❌ [{self.name}] {e}")
+            return
+        finally:
+            with self._lock:
+                self.metrics.items_in += len(batch)
+                self.metrics.busy_seconds += time.perf_counter() - start
+
+        with self._lock:
+            self.metrics.items_out += len(outputs)
+        if self.outbox is not None:
+            for item in outputs:
+                self.outbox.put(item)
+
+    def _worker(self):
+        batch = []
+        while True:
+            try:
+                item = self.inbox.get(timeout=self.batch_wait)
+            except queue.Empty:
+                if batch:
+                    self._process(batch)
+                    batch = []
+                continue
+
+            if item is STOP:
+                # Let sibling workers see the end of the stream too
+                self.inbox.put(STOP)
+                break
+
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._process(batch)
+                batch = []
+
+        if batch:
+            self._process(batch)
+
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last:
+            self.metrics.finished_at = time.perf_counter()
+            if self.outbox is not None:
+                self.outbox.put(STOP)
+
+    def start(self):
+        self.metrics.started_at = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+
+class Pipeline:
+    """
+    Chains Stages with bounded queues and feeds them from an iterable.
+    All stages run at once, so e.g. parsing overlaps with downloading.
+    """
+
+    def __init__(self, stages, progress_interval=5.0):
+        self.stages = stages
+        self.progress_interval = progress_interval
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.outbox = downstream.inbox
+
+    def progress(self):
+        return " | ".join(
+            f"{stage.name}: {stage.metrics.items_in} done, {stage.inbox.qsize()} queued"
+            for stage in self.stages
+        )
+
+    def run(self, source):
+        """Pushes every item of `source` through the stages and blocks until all are done."""
+        threads = [thread for stage in self.stages for thread in stage.start()]
+
+        finished = threading.Event()
+
+        def report_progress():
+            while not finished.wait(self.progress_interval):
+                print(f"   📈 {self.progress()}")
+
+        reporter = threading.Thread(target=report_progress, daemon=True)
+        reporter.start()
+
+        first = self.stages[0].inbox
+        for item in source:
+            first.put(item)
+        first.put(STOP)
+
+        for thread in threads:
+            thread.join()
+        finished.set()
+
+        return [stage.metrics for stage in self.stages]
+
+    @staticmethod
+    def summary(metrics):
+        lines = []
+        for m in metrics:
+            lines.append(
+                f"   {m.name:<10} in={m.items_in:<6} out={m.items_out:<6} errors={m.errors:<4} "
+                f"{m.throughput():.1f}/s  busy={m.busy_seconds:.1f}s"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,198 @@
+import re
+import math
+import hashlib
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+import tiktoken
+from src.config import settings
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    return WORD.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Keyword index (Okapi BM25) over chunk texts.
+    Catches exact terms (names, acronyms, code) that embeddings can blur.
+    """
+
+    def __init__(self, ids: list, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)   # term -> [(doc index, term frequency)]
+        self.lengths = []
+
+        for i, document in enumerate(documents):
+            terms = tokenize(document or "")
+            self.lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((i, tf))
+
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def search(self, query: str, k: int) -> list:
+        """Returns the top `k` (id, score) pairs, best first."""
+        scores = defaultdict(float)
+        n = len(self.ids)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = 1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.ids[i], score) for i, score in best]
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> dict:
+    """Merges ranked ID lists; an ID near the top of either list scores high."""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            fused[chunk_id] += 1.0 / (k + rank + 1)
+    return fused
+
+
+def mmr(embeddings: dict, relevance: dict, lambda_: float, duplicate_threshold: float = 0.95) -> list:
+    """
+    Maximal Marginal Relevance: orders IDs by relevance while penalizing
+    chunks that are too similar to ones already picked (rolling-caption overlap,
+    the same point made twice, ...). Chunks at least `duplicate_threshold`
+    similar to a picked one are dropped.
+    """
+    ids = list(embeddings)
+    if not ids:
+        return []
+    matrix = np.asarray([embeddings[chunk_id] for chunk_id in ids], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+
+    top = max(relevance.values()) or 1.0
+    scores = np.asarray([relevance[chunk_id] / top for chunk_id in ids], dtype=np.float32)
+    similarity = matrix @ matrix.T
+
+    picked, remaining = [], list(range(len(ids)))
+    while remaining:
+        if picked:
+            redundancy = similarity[np.ix_(remaining, picked)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        marginal = lambda_ * scores[remaining] - (1 - lambda_) * redundancy
+        best = remaining.pop(int(np.argmax(marginal)))
+        picked.append(best)
+        remaining = [i for i in remaining if similarity[i, best] < duplicate_threshold]
+    return [ids[i] for i in picked]
+
+
+class HybridRetriever:
+    """
+    The retrieval stage: BM25 + vector search -> RRF fusion -> MMR -> token budget.
+    The BM25 index is built from the collection and rebuilt when its chunk IDs change.
+    """
+
+    def __init__(self, collection, candidates: int = 20, token_budget: int = 1500,
+                 mmr_lambda: float = 0.7, duplicate_threshold: float = 0.95, rrf_k: int = 60,
+                 encoding: str = "cl100k_base"):
+        self.collection = collection
+        self.candidates = candidates
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.rrf_k = rrf_k
+        self.encoding_name = encoding
+        self._encoding = None
+        self._lock = threading.Lock()
+        self._index, self._indexed_version = None, None
+
+    def count_tokens(self, text: str) -> int:
+        # Loaded lazily: chunks ingested with token counts never need it (works offline)
+        if self._encoding is None:
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        return len(self._encoding.encode(text))
+
+    def collection_version(self) -> str:
+        """
+        Hash of the sorted chunk IDs. IDs are derived from chunk text, so a
+        re-ingest that replaces chunks changes it even when the count stays the same
+        (also when another process, e.g. the ingest CLI, wrote to the collection).
+        """
+        ids = sorted(self.collection.get(include=[])["ids"])
+        return hashlib.sha256("\0".join(ids).encode("utf-8")).hexdigest()
+
+    def keyword_index(self) -> BM25Index:
+        with self._lock:
+            version = self.collection_version()
+            if version != self._indexed_version:
+                data = self.collection.get(include=["documents"])
+                self._index = BM25Index(data["ids"], data["documents"])
+                self._indexed_version = version
+            return self._index
+
+    def retrieve(self, query: str, query_embedding: list) -> dict:
+        """Returns the packed context as {"ids", "documents", "metadatas"}."""
+        vector = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=self.candidates,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        chunks = {
+            chunk_id: {"document": document, "metadata": metadata, "embedding": embedding}
+            for chunk_id, document, metadata, embedding in zip(
+                vector["ids"][0], vector["documents"][0], vector["metadatas"][0], vector["embeddings"][0]
+            )
+        }
+        keyword_ids = [chunk_id for chunk_id, _ in self.keyword_index().search(query, self.candidates)]
+
+        # Keyword-only hits still need their text and vectors
+        missing = [chunk_id for chunk_id in keyword_ids if chunk_id not in chunks]
+        if missing:
+            extra = self.collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+            for chunk_id, document, metadata, embedding in zip(
+                extra["ids"], extra["documents"], extra["metadatas"], extra["embeddings"]
+            ):
+                chunks[chunk_id] = {"document": document, "metadata": metadata, "embedding": embedding}
+
+        fused = reciprocal_rank_fusion([vector["ids"][0], keyword_ids], k=self.rrf_k)
+        fused = {chunk_id: score for chunk_id, score in fused.items() if chunk_id in chunks}
+        order = mmr(
+            {chunk_id: chunks[chunk_id]["embedding"] for chunk_id in fused},
+            fused,
+            self.mmr_lambda,
+            self.duplicate_threshold
+        )
+        return self.pack(order, chunks)
+
+    def pack(self, order: list, chunks: dict) -> dict:
+        """Takes chunks in order until the token budget is spent (always at least one)."""
+        packed = {"ids": [], "documents": [], "metadatas": []}
+        used = 0
+        for chunk_id in order:
+            chunk = chunks[chunk_id]
+            tokens = (chunk["metadata"] or {}).get("tokens") or self.count_tokens(chunk["document"])
+            if packed["ids"] and used + tokens > self.token_budget:
+                continue
+            packed["ids"].append(chunk_id)
+            packed["documents"].append(chunk["document"])
+            packed["metadatas"].append(chunk["metadata"])
+            used += tokens
+        return packed
+
+
+def get_retriever(collection) -> HybridRetriever:
+    """Builds the retriever configured in Config."""
+    return HybridRetriever(
+        collection,
+        candidates=settings.RETRIEVAL_CANDIDATES,
+        token_budget=settings.CONTEXT_TOKEN_BUDGET,
+        mmr_lambda=settings.MMR_LAMBDA,
+        duplicate_threshold=settings.DUPLICATE_THRESHOLD,
+        rrf_k=settings.RRF_K,
+        encoding=settings.TOKENIZER_ENCODING
+    )
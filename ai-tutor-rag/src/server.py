@@ -0,0 +1,96 @@
+import json
+import asyncio
+import argparse
+from urllib.parse import urlparse, parse_qs
+from src.config import settings
+from src.tutor import AITutor
+
+class TutorServer:
+    """
+    A small HTTP server that streams answers as Server-Sent Events.
+    One process, one AITutor (shared DB, caches and OpenAI clients),
+    many concurrent students.
+
+        GET /ask?q=What+is+RAG   ->  text/event-stream of tokens
+        GET /health              ->  {"status": "ok"}
+    """
+
+    def __init__(self, tutor: AITutor, max_streams: int = 32):
+        self.tutor = tutor
+        # Caps concurrent generations; extra students wait their turn
+        self.slots = asyncio.Semaphore(max_streams)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            # Skip the headers; GET requests carry everything in the URL
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            if len(request_line) < 2 or request_line[0] != "GET":
+                await self.send_json(writer, 405, {"error": "Only GET is supported."})
+                return
+
+            url = urlparse(request_line[1])
+            if url.path == "/health":
+                await self.send_json(writer, 200, {"status": "ok"})
+            elif url.path == "/ask":
+                query = parse_qs(url.query).get("q", [""])[0].strip()
+                if not query:
+                    await self.send_json(writer, 400, {"error": "Missing ?q= parameter."})
+                else:
+                    await self.stream_answer(writer, query)
+            else:
+                await self.send_json(writer, 404, {"error": "Not found."})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The student closed the tab; the generator is cancelled with the task
+            pass
+        finally:
+            writer.close()
+
+    async def stream_answer(self, writer: asyncio.StreamWriter, query: str):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        await writer.drain()
+
+        async with self.slots:
+            try:
+                async for token in self.tutor.ask_stream(query):
+                    writer.write(f"data: {json.dumps(token)}\n\n".encode("utf-8"))
+                    await writer.drain()
+            except ConnectionError:
+                raise
+            except Exception as e:
+                writer.write(f"event: error\ndata: {json.dumps(str(e))}\n\n".encode("utf-8"))
+        writer.write(b"event: done\ndata: {}\n\n")
+        await writer.drain()
+
+    async def send_json(self, writer: asyncio.StreamWriter, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+
+async def serve(host: str, port: int):
+    server = TutorServer(AITutor(), max_streams=settings.SERVER_MAX_STREAMS)
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"🌐 Tutor serving on http://{host}:{port}/ask?q=...")
+    async with listener:
+        await listener.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the AI Tutor over HTTP (Server-Sent Events).")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port))
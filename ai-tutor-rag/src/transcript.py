@@ -0,0 +1,63 @@
+import re
+import html
+from dataclasses import dataclass, field
+from src.chunking import Segment
+
+# Inline cue tags: <00:00:01.234> word timings, <c>, </c>, <c.colorE5E5E5>, <i> ...
+CUE_TAG = re.compile(r"<[^>]*>")
+# Longest repeated run we look for between consecutive cues
+MAX_OVERLAP_WORDS = 64
+# Shorter partial overlaps are treated as coincidence ("the ... the")
+MIN_OVERLAP_WORDS = 2
+
+
+@dataclass
+class Transcript:
+    """Compact transcript text plus a timing index of the Segments that produced it."""
+    text: str
+    segments: list = field(default_factory=list)
+    raw_words: int = 0
+
+    @property
+    def words(self) -> int:
+        return len(self.text.split())
+
+
+def clean_cue_text(raw_text: str) -> list:
+    """Strips cue tags and entities; returns the cue's words."""
+    return html.unescape(CUE_TAG.sub("", raw_text)).split()
+
+def _overlap(tail: list, words: list) -> int:
+    """Length of the longest prefix of `words` that the emitted `tail` ends with."""
+    for k in range(min(len(tail), len(words)), 0, -1):
+        if tail[-k:] == words[:k]:
+            if k >= MIN_OVERLAP_WORDS or k == len(words):
+                return k
+    return 0
+
+def normalize_captions(cues) -> Transcript:
+    """
+    Builds a compact transcript from (raw_text, start, end) cues in one pass.
+
+    YouTube auto-captions roll: each cue repeats the previous line before
+    adding a new one, and short "transition" cues repeat it again. Only the
+    words a cue adds beyond the text already emitted are kept, so each
+    spoken word appears once, timed by the cue that introduced it.
+    """
+    emitted = []      # all kept words, in order
+    segments = []
+    raw_words = 0
+
+    for raw_text, start, end in cues:
+        words = clean_cue_text(raw_text)
+        raw_words += len(words)
+        if not words:
+            continue
+
+        k = _overlap(emitted[-MAX_OVERLAP_WORDS:], words)
+        new_words = words[k:]
+        if new_words:
+            emitted.extend(new_words)
+            segments.append(Segment(" ".join(new_words), start, end))
+
+    return Transcript(text=" ".join(emitted), segments=segments, raw_words=raw_words)
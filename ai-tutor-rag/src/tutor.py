@@ -1,64 +1,96 @@
 import os
+import re
+import asyncio
 import chromadb
-from chromadb.utils import embedding_functions
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from colorama import Fore, Style, init
 from src.config import settings
+from src.embeddings import get_embedding_provider, open_collection
+from src.cache import SQLiteCache, SemanticCache, text_hash
+from src.retrieval import get_retriever
 
 # Initialize Colors for the Terminal
 init(autoreset=True)
 
+def normalize_query(query: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
 class AITutor:
     """
     The RAG Brain.
     Retrieves knowledge from ChromaDB and generates answers using GPT-4o.
+    Repeated questions are served from a local cache (see Config).
+
+    Every dependency defaults to the Config setup and can be injected
+    (e.g. a temp ChromaDB client and stub backends in benchmarks).
     """
-    
-    def __init__(self):
+
+    def __init__(self, client=None, embedding_provider=None, ai_client=None, async_ai_client=None,
+                 use_cache: bool = True):
         # 1. Connect to the same DB where we saved the data
-        self.client = chromadb.PersistentClient(path=str(settings.DB_PATH))
-        
-        # 2. Use the exact same translator (Embedding Function)
-        openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=settings.OPENAI_API_KEY,
-            model_name=settings.EMBEDDING_MODEL
-        )
-        
-        self.collection = self.client.get_collection(
-            name=settings.COLLECTION_NAME,
-            embedding_function=openai_ef
-        )
-        
-        self.ai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = client or chromadb.PersistentClient(path=str(settings.DB_PATH))
+
+        # 2. Use the exact same translator (Embedding Provider); a mismatch raises
+        self.embedding_provider = embedding_provider or get_embedding_provider()
+        self.collection = open_collection(self.client, self.embedding_provider, settings.COLLECTION_NAME)
+
+        # BM25 + vector search, deduplicated and packed to a token budget
+        self.retriever = get_retriever(self.collection)
+
+        self.ai_client = ai_client or OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Shared by every concurrent ask_stream() call (one connection pool)
+        self.async_ai_client = async_ai_client or AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+        # 3. The layered cache: query -> embedding, (query + chunks) -> answer,
+        #    and near-duplicate questions -> answer
+        self.embedding_cache = self.answer_cache = self.semantic_cache = None
+        if use_cache:
+            self._open_caches()
         print(f"{Fore.GREEN}✅ Tutor Online. Connected to Knowledge Base.")
 
-    def ask(self, query: str):
-        """
-        The Thinking Process: Search -> Contextualize -> Answer.
-        """
-        print(f"{Fore.CYAN}🔍 Searching knowledge base...")
-        
-        # --- STEP 1: RETRIEVAL ---
-        # Search the DB for the 3 most relevant chunks
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=7
+    def _open_caches(self):
+        self.embedding_cache = SQLiteCache(
+            settings.TUTOR_CACHE_PATH, "query_embedding",
+            max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUERY_CACHE_TTL
         )
-        
-        # Extract the text from the search results
-        context_chunks = results['documents'][0]
-        
-        if not context_chunks:
-            return "I couldn't find any relevant information in the video."
+        self.answer_cache = SQLiteCache(
+            settings.TUTOR_CACHE_PATH, "answer",
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL
+        )
+        if settings.SEMANTIC_CACHE_THRESHOLD:
+            self.semantic_cache = SemanticCache(
+                settings.TUTOR_CACHE_PATH,
+                f"{self.embedding_provider.name}:{settings.COLLECTION_NAME}",
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.ANSWER_CACHE_TTL
+            )
+
+    def embed_query(self, query: str) -> list:
+        """Embeds the question, reusing the cached vector for a repeated question."""
+        if self.embedding_cache is None:
+            return list(self.embedding_provider.embed([query])[0])
+
+        key = text_hash(normalize_query(query), self.embedding_provider.name)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = list(self.embedding_provider.embed([query])[0])
+            self.embedding_cache.set(key, embedding)
+        return embedding
 
+    def retrieve(self, query: str, embedding: list) -> dict:
+        """Returns the context chunks as {"ids", "documents", "metadatas"}."""
+        return self.retriever.retrieve(query, embedding)
+
+    def build_messages(self, query: str, context_chunks: list) -> list:
         # Combine chunks into a single block of text
         context_text = "\n\n".join(context_chunks)
-        
-        # --- STEP 2: GENERATION ---
-        print(f"{Fore.CYAN}🧠 Thinking...")
-        
+
         PROMPT = f"""
-        You are an expert AI Tutor. 
+        You are an expert AI Tutor.
         Answer the question based on the context provided below.
         If the context contains partial information, summarize what is there.
         Only say "I don't know" if the context is completely irrelevant.
@@ -70,29 +102,120 @@ class AITutor:
         QUESTION: {query}
         """
 
+        return [
+            {"role": "system", "content": "You are a helpful teacher."},
+            {"role": "user", "content": PROMPT}
+        ]
+
+    def generate(self, query: str, context_chunks: list) -> str:
         response = self.ai_client.chat.completions.create(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful teacher."},
-                {"role": "user", "content": PROMPT}
-            ]
+            messages=self.build_messages(query, context_chunks)
         )
-        
+
         return response.choices[0].message.content
 
+    def prepare(self, query: str) -> dict:
+        """
+        Everything before generation (blocking: embedding, cache lookups, ChromaDB).
+        Returns {"answer": ...} when the answer is already known, otherwise
+        {"answer": None, "context": [...], "key": ..., "embedding": [...]}.
+        """
+        embedding = self.embed_query(query)
+
+        # A near-duplicate of a recent question skips retrieval and generation
+        if self.semantic_cache:
+            hit = self.semantic_cache.lookup(embedding)
+            if hit:
+                print(f"{Fore.CYAN}⚡ Answered from cache (similarity {hit[1]:.2f}).")
+                return {"answer": hit[0]}
+
+        print(f"{Fore.CYAN}🔍 Searching knowledge base...")
+
+        # --- STEP 1: RETRIEVAL ---
+        # Fuse keyword + vector hits, drop near-duplicates, fit the token budget
+        retrieved = self.retrieve(query, embedding)
+        context_chunks = retrieved["documents"]
+
+        if not context_chunks:
+            return {"answer": "I couldn't find any relevant information in the video."}
+
+        # Same question over the same chunks -> same answer
+        answer_key = text_hash(normalize_query(query), ",".join(sorted(retrieved["ids"])))
+        answer = self.answer_cache.get(answer_key) if self.answer_cache else None
+        if answer is not None:
+            print(f"{Fore.CYAN}⚡ Answered from cache.")
+            return {"answer": answer}
+
+        return {"answer": None, "context": context_chunks, "key": answer_key, "embedding": embedding}
+
+    def remember(self, prepared: dict, answer: str):
+        """Stores a freshly generated answer in the answer and semantic caches."""
+        if self.answer_cache:
+            self.answer_cache.set(prepared["key"], answer)
+        if self.semantic_cache:
+            self.semantic_cache.add(prepared["key"], prepared["embedding"], answer)
+
+    def ask(self, query: str):
+        """
+        The Thinking Process: Search -> Contextualize -> Answer.
+        """
+        prepared = self.prepare(query)
+        if prepared["answer"] is not None:
+            return prepared["answer"]
+
+        # --- STEP 2: GENERATION ---
+        print(f"{Fore.CYAN}🧠 Thinking...")
+        answer = self.generate(query, prepared["context"])
+        self.remember(prepared, answer)
+        return answer
+
+    async def ask_stream(self, query: str):
+        """
+        Async version of ask() that yields the answer as it is generated.
+        Retrieval runs in a worker thread so the event loop keeps serving
+        other students; a cached answer is yielded in one piece.
+        """
+        prepared = await asyncio.to_thread(self.prepare, query)
+        if prepared["answer"] is not None:
+            yield prepared["answer"]
+            return
+
+        stream = await self.async_ai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=self.build_messages(query, prepared["context"]),
+            stream=True
+        )
+
+        pieces = []
+        async for event in stream:
+            if not event.choices:
+                continue
+            token = event.choices[0].delta.content
+            if token:
+                pieces.append(token)
+                yield token
+
+        # Only complete answers are cached (a dropped client never gets here)
+        await asyncio.to_thread(self.remember, prepared, "".join(pieces))
+
 # Main Chat Loop
-if __name__ == "__main__":
-    tutor = AITutor()
-    
+async def chat(tutor: AITutor):
     print(f"\n{Fore.YELLOW}🎓 AI TUTOR READY! (Type 'quit' to exit)")
     print("Ask me anything about the video you just ingested.")
     print("-" * 50)
-    
+
     while True:
-        user_input = input(f"\n{Fore.WHITE}You: ")
+        user_input = await asyncio.to_thread(input, f"\n{Fore.WHITE}You: ")
         if user_input.lower() in ["quit", "exit"]:
             break
-            
-        answer = tutor.ask(user_input)
-        print(f"\n{Fore.GREEN}Tutor:{Style.RESET_ALL} {answer}")
-        print("-" * 50)
\ No newline at end of file
+
+        # Print tokens as they arrive instead of waiting for the whole answer
+        print(f"\n{Fore.GREEN}Tutor:{Style.RESET_ALL} ", end="", flush=True)
+        async for token in tutor.ask_stream(user_input):
+            print(token, end="", flush=True)
+        print()
+        print("-" * 50)
+
+if __name__ == "__main__":
+    asyncio.run(chat(AITutor()))
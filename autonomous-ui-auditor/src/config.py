@@ -24,6 +24,7 @@ class Config:
         "tablet": {"width": 768, "height": 1024},
         "mobile": {"width": 375, "height": 667}
     }
+    USER_AGENT = "Mozilla/5.0 (compatible; UI-Auditor/1.0)"
     
     # 3. Timeouts (in milliseconds)
     # Give the page 15 seconds to load (safer for slow sites)
@@ -31,7 +32,32 @@ class Config:
     
     # 4. Agent Identity
     AGENT_NAME = os.getenv("AGENT_NAME", "UI-Auditor-v1")
-    
+
+    # 5. Site Audit (many pages, one shared browser)
+    MAX_CONCURRENT_PAGES = 4    # Browser contexts open at once
+    PAGE_TIMEOUT_S = 120        # Whole audit of one page (load + scan + AI report)
+    MAX_PAGES = 300             # Stop discovering pages after this many
+
+    # 6. Accessibility Scan
+    # axe-core only runs rules with these tags (WCAG 2.0/2.1, levels A and AA).
+    # Add "best-practice" for axe's extra checks, or use [] to run every rule.
+    AXE_TAGS = ["wcag2a", "wcag2aa", "wcag21a", "wcag21aa"]
+
+    # 7. Images sent to GPT-4o
+    # Screenshots are resized to what the model actually sees and re-encoded,
+    # and tall full-page shots are cut into viewport-height tiles.
+    IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG")   # JPEG | WEBP
+    IMAGE_QUALITY = 80          # 1-100, lower = smaller upload
+    IMAGE_DETAIL = os.getenv("IMAGE_DETAIL", "high")   # high | low | auto ("low" = one 512px view, no tiles)
+    MAX_TILES = 4               # Per viewport; longer pages get taller tiles
+
+    # 8. Audit Cache
+    # Unchanged pages (same DOM and CSS, same images) reuse their last
+    # axe-core results and GPT-4o report instead of paying for them again.
+    AUDIT_CACHE_ENABLED = os.getenv("AUDIT_CACHE", "1") != "0"
+    AUDIT_CACHE_PATH = OUTPUT_DIR / "audit_cache.sqlite"
+    AUDIT_CACHE_TTL_S = 7 * 24 * 3600   # Re-audit at least once a week
+
     # Ensure output directory exists when config is loaded
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -1,100 +1,330 @@
 import asyncio
-import base64
+import argparse
+import hashlib
+import json
 import os
+import re
+from datetime import datetime
 from openai import AsyncOpenAI
-from playwright.async_api import async_playwright
 from src.config import settings
+from src.tools.accessibility import AccessibilityTool, AccessibilityResult, aggregate_violations
+from src.tools.audit_cache import AuditCache, content_key, dom_hash
 from src.tools.browser import BrowserTool
-from src.tools.accessibility import AccessibilityTool
+from src.tools.browser_pool import BrowserPool
+from src.tools.imaging import prepare_image, image_parts, tiles_hash
+from src.tools.sitemap import load_sitemap, extract_links, normalize_url, origin, is_auditable
 
 # Initialize OpenAI Client
 client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-async def run_audit_agent(url: str):
+# Part of every cached report's key: bump it when the prompt (or what is sent
+# with it) changes, so reports written for the old prompt are not reused
+PROMPT_VERSION = 1
+MODEL = "gpt-4o"
+
+def page_slug(url: str) -> str:
     """
-    The Main Brain. 
-    Orchestrates the browser, the vision analysis, and the technical audit.
+    File-system friendly, unique name for a page, e.g. 'example.com_about_1a2b3c4d'.
+    The readable part is lossy (/a-b and /a_b look alike), so a hash of the full URL keeps names apart.
     """
-    print(f"\n🤖 AGENT ACTIVATED: Auditing {url}\n" + "="*50)
+    readable = re.sub(r"[^A-Za-z0-9]+", "_", url.split("://", 1)[-1]).strip("_")[:80] or "page"
+    return f"{readable}_{hashlib.sha256(url.encode('utf-8')).hexdigest()[:8]}"
+
+async def audit_page(pool: BrowserPool, url: str, output_dir, collect_links: bool = False,
+                     cache: AuditCache = None) -> dict:
+    """
+    Audits one page: screenshots at every viewport (visual data), loaded
+    concurrently in the shared browser, + axe-core scan of the desktop page
+    (code data) -> GPT-4o report.
+    With a `cache`, the scan is reused while the desktop DOM is unchanged, and
+    the report while no viewport's DOM or prepared images changed.
+    """
+    found = {"accessibility": None, "links": [], "dom": {}}
+
+    async def prepare(device_type, context):
+        # axe-core is registered once per context and is ready when the page loads
+        if device_type == "desktop":
+            await AccessibilityTool.register(context)
 
-    async with async_playwright() as p:
-        # 1. Launch Browser
-        browser = await p.chromium.launch(headless=True) # Set False to watch it work
-        page = await browser.new_page()
-        
-        # 2. Navigate
-        print("🌍 Navigating to site...")
-        await page.goto(url, timeout=settings.TIMEOUT_MS, wait_until="domcontentloaded")
-
-        # 3. TOOL 1: Take Screenshot (Visual Data)
-        print("👁️  Agent is looking at the page...")
-        screenshot_path = settings.OUTPUT_DIR / "audit_screenshot.png"
-        await page.screenshot(path=str(screenshot_path), full_page=True)
-        
-        # Convert image for OpenAI
-        with open(screenshot_path, "rb") as img:
-            base64_image = base64.b64encode(img.read()).decode('utf-8')
-
-        # 4. TOOL 2: Run Technical Scan (Code Data)
-        print("🧠 Agent is running technical diagnostics...")
-        tech_report = await AccessibilityTool.scan_page(page)
-        
-        # 5. The Analysis (Send everything to GPT-4o)
-        print("📝 Generating Final Report...")
-        
-        PROMPT = f"""
-        You are a Senior UI/UX Engineer and Accessibility Expert.
-        
-        I have provided you with:
-        1. A screenshot of the website (Visual Context).
-        2. A technical accessibility report (Code Context).
-
-        TECHNICAL REPORT:
-        {tech_report}
-
-        YOUR TASK:
-        Analyze this website and provide a professional audit.
-        1. VISUAL DESIGN: Critique color, spacing, and layout.
-        2. ACCESSIBILITY: Summarize the technical errors found.
-        3. CODE FIXES: Provide specific Tailwind CSS or HTML fixes for the errors.
-        
-        Be critical and precise.
-        """
-
-        response = await client.chat.completions.create(
-            model="gpt-4o", # We need the Vision model
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are a pixel-perfect design auditor."
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": PROMPT},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ],
-                }
-            ],
-            max_tokens=1000
+    async def inspect(device_type, page):
+        if cache:
+            found["dom"][device_type] = await dom_hash(page)
+        # TOOL 2: Run Technical Scan (Code Data) on the desktop page only
+        if device_type != "desktop":
+            return
+        dom = found["dom"].get(device_type)
+        scan_key = content_key(url, dom, device_type, settings.AXE_TAGS, AccessibilityTool.AXE_URL) if dom else None
+        cached = cache.get("axe", scan_key) if scan_key else None
+        if cached:
+            print(f"♻️  Reusing cached accessibility scan for {url}")
+            found["accessibility"] = AccessibilityResult.model_validate(cached)
+        else:
+            print(f"🧠 Agent is running technical diagnostics on {url}...")
+            found["accessibility"] = await AccessibilityTool.scan(page)
+            if scan_key and found["accessibility"].error is None:
+                cache.set("axe", scan_key, found["accessibility"].model_dump())
+        # Links are read while the page is still open (for crawling)
+        if collect_links:
+            found["links"] = await extract_links(page)
+
+    # 1. TOOL 1: Take Screenshots (Visual Data), one context per viewport
+    print(f"👁️  Agent is looking at {url}...")
+    captures = await BrowserTool.capture_viewports(
+        url, pool=pool, on_context=prepare, on_page=inspect, full_page=True, output_dir=output_dir, name=page_slug(url)
+    )
+    screenshots = {device: capture for device, capture in captures.items() if capture["status"] == "success"}
+    if not screenshots:
+        raise RuntimeError(next(iter(captures.values()))["message"])
+    accessibility = found["accessibility"]
+    tech_report = accessibility.format_report() if accessibility else "⚠️ SKIPPED: The desktop page did not load."
+
+    result = {
+        "url": url,
+        "status": "success",
+        "screenshots": {device: capture["path"] for device, capture in screenshots.items()},
+        "accessibility": accessibility,
+        "accessibility_report": tech_report,
+        "cached": False,
+        "links": found["links"]
+    }
+
+    # Labelled images per viewport: full-page shots are cut into viewport-height
+    # tiles, resized to the model's resolution and re-encoded (see imaging.py)
+    images = {
+        device: await asyncio.to_thread(prepare_image, capture["path"], capture["size"]["height"])
+        for device, capture in screenshots.items()
+    }
+
+    # The same DOM and exactly the same images at every viewport, sent with the
+    # same prompt and model -> the same report
+    report_key = None
+    if cache and all(found["dom"].get(device) for device in screenshots):
+        report_key = content_key(
+            url, PROMPT_VERSION, MODEL,
+            *(f"{device}:{found['dom'][device]}:{tiles_hash(images[device])}" for device in sorted(screenshots))
         )
+        report = cache.get("report", report_key)
+        if report:
+            print(f"♻️  {url} is unchanged, reusing the cached report.")
+            return {**result, "report": report, "cached": True}
+
+    # 2. The Analysis (Send everything to GPT-4o)
+    print(f"📝 Generating report for {url}...")
+
+    PROMPT = f"""
+    You are a Senior UI/UX Engineer and Accessibility Expert.
+
+    I have provided you with:
+    1. Screenshots of the website at these viewports: {", ".join(screenshots)} (Visual Context).
+    2. A technical accessibility report (Code Context).
+
+    TECHNICAL REPORT:
+    {tech_report}
+
+    YOUR TASK:
+    Analyze this website and provide a professional audit.
+    1. VISUAL DESIGN: Critique color, spacing, and layout.
+    2. RESPONSIVE DESIGN: Compare the viewports; point out anything that breaks or gets cramped.
+    3. ACCESSIBILITY: Summarize the technical errors found.
+    4. CODE FIXES: Provide specific Tailwind CSS or HTML fixes for the errors.
+
+    Be critical and precise.
+    """
+
+    content = [{"type": "text", "text": PROMPT}]
+    for device, capture in screenshots.items():
+        size = capture["size"]
+        content += image_parts(images[device], f"{device.upper()} ({size['width']}x{size['height']})")
+
+    response = await client.chat.completions.create(
+        model=MODEL, # We need the Vision model
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a pixel-perfect design auditor."
+            },
+            {
+                "role": "user",
+                "content": content,
+            }
+        ],
+        max_tokens=1000
+    )
+
+    report = response.choices[0].message.content
+    if report_key and report:
+        cache.set("report", report_key, report)
+    return {**result, "report": report}
+
+async def audit_with_timeout(pool: BrowserPool, url: str, output_dir, timeout: float,
+                             collect_links: bool = False, cache: AuditCache = None) -> dict:
+    """Runs audit_page under a timeout; a slow or broken page never stops the batch."""
+    try:
+        return await asyncio.wait_for(audit_page(pool, url, output_dir, collect_links, cache), timeout)
+    except asyncio.TimeoutError:
+        print(f"⏰ Timed out after {timeout}s: {url}")
+        return {"url": url, "status": "timeout", "message": f"Audit took longer than {timeout}s"}
+    except Exception as e:
+        print(f"❌ Error auditing {url}: {e}")
+        return {"url": url, "status": "error", "message": str(e)}
+
+async def run_audit_agent(url: str, use_cache: bool = settings.AUDIT_CACHE_ENABLED):
+    """
+    The Main Brain.
+    Orchestrates the browser, the vision analysis, and the technical audit for one page.
+    """
+    print(f"\n🤖 AGENT ACTIVATED: Auditing {url}\n" + "="*50)
+
+    cache = AuditCache() if use_cache else None
+    try:
+        # One context per viewport, all in the same browser (headless=False to watch it work)
+        async with BrowserPool(max_contexts=len(settings.VIEWPORTS)) as pool:
+            result = await audit_with_timeout(pool, url, settings.OUTPUT_DIR, settings.PAGE_TIMEOUT_S, cache=cache)
+    finally:
+        if cache:
+            cache.close()
+
+    # Output the Result
+    print("\n" + "="*50)
+    print("📄 FINAL AUDIT REPORT")
+    print("="*50)
+    print(result.get("report") or result["message"])
+    return result
+
+async def run_site_audit(urls: list, crawl: bool = False, max_pages: int = settings.MAX_PAGES,
+                         concurrency: int = settings.MAX_CONCURRENT_PAGES,
+                         timeout: float = settings.PAGE_TIMEOUT_S,
+                         use_cache: bool = settings.AUDIT_CACHE_ENABLED) -> dict:
+    """
+    Audits many pages with ONE shared browser.
+    `concurrency` pages are audited at once, each in its own context and under
+    its own timeout. With `crawl`, same-origin links found on audited pages are
+    queued too, up to `max_pages`. Unchanged pages reuse cached results
+    (see AuditCache). Returns the aggregated site report.
+    """
+    output_dir = settings.OUTPUT_DIR / f"site_audit_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    origins = {origin(url) for url in urls}
+    queue = asyncio.Queue()
+    seen, results = set(), []
+
+    def enqueue(url: str):
+        url = normalize_url(url)
+        if url not in seen and len(seen) < max_pages and is_auditable(url, origins):
+            seen.add(url)
+            queue.put_nowait(url)
+
+    for url in urls:
+        enqueue(url)
 
-        # 6. Output the Result
-        final_advice = response.choices[0].message.content
-        print("\n" + "="*50)
-        print("📄 FINAL AUDIT REPORT")
-        print("="*50)
-        print(final_advice)
-        
-        # Cleanup
-        await browser.close()
+    print(f"\n🤖 SITE AUDIT: {len(seen)} page(s), {concurrency} at a time"
+          f"{' (crawling)' if crawl else ''}\n" + "="*50)
+
+    cache = AuditCache() if use_cache else None
+    try:
+        # Every page opens one context per viewport; sizing the pool for all of them
+        # means a page never waits on contexts held by another half-started page
+        async with BrowserPool(max_contexts=concurrency * len(settings.VIEWPORTS)) as pool:
+            async def worker():
+                while True:
+                    url = await queue.get()
+                    try:
+                        result = await audit_with_timeout(pool, url, output_dir, timeout, collect_links=crawl, cache=cache)
+                        for link in result.pop("links", []):
+                            enqueue(link)
+                        results.append(result)
+                        status = "cached" if result.get("cached") else result["status"]
+                        print(f"✅ [{len(results)}/{len(seen)}] {url} -> {status}")
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+            await queue.join()
+            for task in workers:
+                task.cancel()
+    finally:
+        if cache:
+            cache.close()
+
+    report = write_site_report(results, output_dir)
+    print(f"\n📊 Site report saved to {output_dir}")
+    return report
+
+def write_site_report(results: list, output_dir) -> dict:
+    """Writes report.json (machine readable) and report.md (one section per page)."""
+    results = sorted(results, key=lambda result: result["url"])
+    scans = [r["accessibility"] for r in results if r.get("accessibility")]
+    top_violations = aggregate_violations(scans)
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "pages": len(results),
+        "audited": sum(r["status"] == "success" for r in results),
+        "cached": sum(bool(r.get("cached")) for r in results),
+        "timeouts": sum(r["status"] == "timeout" for r in results),
+        "errors": sum(r["status"] == "error" for r in results),
+        "pages_with_violations": sum(bool(scan.violations) for scan in scans),
+        "violations_by_rule": top_violations,
+        "results": [
+            {**r, "accessibility": r["accessibility"].model_dump() if r.get("accessibility") else None}
+            for r in results
+        ]
+    }
+
+    with open(output_dir / "report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    lines = [
+        "# 🕵️ Site Audit Report", "",
+        f"* Pages: {report['pages']} (audited {report['audited']}, unchanged since last audit {report['cached']}, "
+        f"timeouts {report['timeouts']}, errors {report['errors']})",
+        f"* Pages with accessibility violations: {report['pages_with_violations']}", ""
+    ]
+    if top_violations:
+        lines += ["| Rule | Impact | Pages | Elements |", "|---|---|---|---|"]
+        lines += [f"| [{v['help']}]({v['help_url']}) | {v['impact']} | {v['pages']} | {v['elements']} |"
+                  for v in top_violations]
+        lines += [""]
+    for result in results:
+        lines += [f"## {result['url']}", ""]
+        if result["status"] != "success":
+            lines += [f"⚠️ {result['status'].upper()}: {result['message']}", ""]
+            continue
+        lines += [" ".join(f"![{device}]({os.path.basename(path)})" for device, path in result["screenshots"].items()),
+                  "", "```", result["accessibility_report"], "```", "", result["report"], ""]
+
+    with open(output_dir / "report.md", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return report
 
 if __name__ == "__main__":
-    # Change this URL to whatever you want to test
-    TARGET_URL = "https://youfirst-agency.vercel.app/" 
-    asyncio.run(run_audit_agent(TARGET_URL))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Audit one page, a list of pages, or a whole site.")
+    parser.add_argument("urls", nargs="*", help="Page URLs (seeds when crawling).")
+    parser.add_argument("--sitemap", help="Audit every page listed in this sitemap.xml.")
+    parser.add_argument("--crawl", action="store_true", help="Follow same-origin links from audited pages.")
+    parser.add_argument("--max-pages", type=int, default=settings.MAX_PAGES)
+    parser.add_argument("--concurrency", type=int, default=settings.MAX_CONCURRENT_PAGES,
+                        help="Pages audited at the same time.")
+    parser.add_argument("--timeout", type=float, default=settings.PAGE_TIMEOUT_S,
+                        help="Seconds allowed for one page.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-scan and re-analyse every page, even if unchanged.")
+    args = parser.parse_args()
+
+    async def main():
+        urls = list(args.urls)
+        if args.sitemap:
+            urls += await load_sitemap(args.sitemap, args.max_pages)
+
+        if not urls:
+            # Change this URL to whatever you want to test
+            urls = ["https://youfirst-agency.vercel.app/"]
+
+        if len(urls) == 1 and not args.crawl:
+            await run_audit_agent(urls[0], use_cache=settings.AUDIT_CACHE_ENABLED and not args.no_cache)
+        else:
+            await run_site_audit(urls, crawl=args.crawl, max_pages=args.max_pages,
+                                 concurrency=args.concurrency, timeout=args.timeout,
+                                 use_cache=settings.AUDIT_CACHE_ENABLED and not args.no_cache)
+
+    asyncio.run(main())
@@ -1,18 +1,117 @@
 import os
 import urllib.request
-from playwright.async_api import Page
+from collections import defaultdict
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from playwright.async_api import BrowserContext, Page
 from src.config import settings
 
+# Runs inside the page: only the fields we use cross the browser boundary
+AXE_RUN_SCRIPT = """async (options) => {
+    const results = await axe.run(document, options);
+    return {
+        violations: results.violations.map(v => ({
+            id: v.id,
+            impact: v.impact,
+            help: v.help,
+            description: v.description,
+            help_url: v.helpUrl,
+            tags: v.tags,
+            nodes: v.nodes.map(n => ({
+                target: n.target.map(String),
+                html: n.html,
+                failure_summary: n.failureSummary || null
+            }))
+        }))
+    };
+}"""
+
+class AxeNode(BaseModel):
+    """One element that fails a rule."""
+    target: List[str] = Field(default_factory=list)   # CSS selector path
+    html: str = ""
+    failure_summary: Optional[str] = None
+
+class Violation(BaseModel):
+    """One failed axe-core rule, with every element that fails it."""
+    id: str
+    impact: Optional[str] = None   # minor | moderate | serious | critical
+    help: str
+    description: str = ""
+    help_url: str = ""
+    tags: List[str] = Field(default_factory=list)
+    nodes: List[AxeNode] = Field(default_factory=list)
+
+class AccessibilityResult(BaseModel):
+    """Structured outcome of one axe-core scan."""
+    url: str = ""
+    tags: List[str] = Field(default_factory=list)
+    violations: List[Violation] = Field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def passed(self) -> bool:
+        return self.error is None and not self.violations
+
+    def filter(self, impacts: List[str]) -> "AccessibilityResult":
+        """Only the violations with one of these impact levels (e.g. ["serious", "critical"])."""
+        return self.model_copy(update={"violations": [v for v in self.violations if v.impact in impacts]})
+
+    def format_report(self) -> str:
+        """Human (and LLM) readable summary, as sent to GPT-4o."""
+        if self.error:
+            return f"❌ Accessibility Scan Failed: {self.error}"
+        if not self.violations:
+            return "✅ PASS: No accessibility violations found."
+
+        report = f"🚨 FAILED: Found {len(self.violations)} Accessibility Violations:\n"
+        for i, violation in enumerate(self.violations, 1):
+            report += f"\n{i}. Issue: {violation.help}\n"
+            report += f"   - Impact: {(violation.impact or 'unknown').upper()}\n"
+            report += f"   - Description: {violation.description}\n"
+            report += f"   - Affected Elements: {len(violation.nodes)}\n"
+            examples = [" ".join(node.target) for node in violation.nodes[:3]]
+            if examples:
+                report += f"   - Examples: {', '.join(examples)}\n"
+        return report
+
+def aggregate_violations(results: List[AccessibilityResult]) -> List[Dict]:
+    """
+    Rolls violations up across pages: one entry per rule with the number of
+    pages and elements affected, worst impact first.
+    """
+    order = {"critical": 0, "serious": 1, "moderate": 2, "minor": 3}
+    rules = {}
+    pages = defaultdict(set)
+    for result in results:
+        for violation in result.violations:
+            entry = rules.setdefault(violation.id, {
+                "id": violation.id,
+                "impact": violation.impact,
+                "help": violation.help,
+                "help_url": violation.help_url,
+                "elements": 0
+            })
+            entry["elements"] += len(violation.nodes)
+            pages[violation.id].add(result.url)
+
+    for rule_id, entry in rules.items():
+        entry["pages"] = len(pages[rule_id])
+    return sorted(rules.values(), key=lambda e: (order.get(e["impact"], 4), -e["pages"], -e["elements"]))
+
 class AccessibilityTool:
     """
     The 'Inspector' of the agent.
     Injects the axe-core engine (Industry Standard) to find code errors.
     """
-    
+
     # We will save the engine here so we don't need to download it every time
     AXE_LOCAL_PATH = settings.BASE_DIR / "src" / "tools" / "axe.min.js"
     AXE_URL = "https://cdnjs.cloudflare.com/ajax/libs/axe-core/4.7.2/axe.min.js"
 
+    # The ~500 KB engine source, read from disk once per process
+    _engine_source: Optional[str] = None
+
     @classmethod
     async def _ensure_engine_exists(cls):
         """
@@ -30,41 +129,57 @@ class AccessibilityTool:
                 return False
         return True
 
-    @staticmethod
-    async def scan_page(page: Page) -> str:
+    @classmethod
+    async def engine_source(cls) -> Optional[str]:
+        """The axe-core source, cached on the class (None if it can't be obtained)."""
+        if cls._engine_source is None and await cls._ensure_engine_exists():
+            with open(cls.AXE_LOCAL_PATH, "r", encoding="utf-8") as f:
+                cls._engine_source = f.read()
+        return cls._engine_source
+
+    @classmethod
+    async def register(cls, context: BrowserContext) -> bool:
         """
-        Injects the 'axe-core' auditing engine into the page and runs a scan.
+        Registers axe-core as an init script: every page opened in this
+        context has `window.axe` ready before its own scripts run
+        (and page CSP can't block it).
+        """
+        source = await cls.engine_source()
+        if source is None:
+            return False
+        await context.add_init_script(script=source)
+        return True
+
+    @classmethod
+    async def scan(cls, page: Page, tags: Optional[List[str]] = None) -> AccessibilityResult:
         """
+        Runs axe-core on the page, limited to rules with these tags
+        (default: Config.AXE_TAGS, i.e. WCAG 2.x A/AA), and returns structured results.
+        """
+        tags = settings.AXE_TAGS if tags is None else tags
         try:
-            print("🩺 Injecting Accessibility Engine (Axe-Core)...")
-            
-            # 1. Ensure we have the engine file locally
-            engine_ready = await AccessibilityTool._ensure_engine_exists()
-            if not engine_ready:
-                return "⚠️ SKIPPED: Could not download auditing engine."
-
-            # 2. Inject the local file (No internet required for this part)
-            await page.add_script_tag(path=str(AccessibilityTool.AXE_LOCAL_PATH))
-            
-            # 3. Run the audit inside the browser console
-            results = await page.evaluate("""async () => {
-                const results = await axe.run();
-                return results.violations;
-            }""")
-            
-            # 4. Process results
-            if not results:
-                return "✅ PASS: No accessibility violations found."
-
-            report = f"🚨 FAILED: Found {len(results)} Accessibility Violations:\n"
-            for i, violation in enumerate(results, 1):
-                report += f"\n{i}. Issue: {violation['help']}\n"
-                report += f"   - Impact: {violation['impact'].upper()}\n"
-                report += f"   - Description: {violation['description']}\n"
-                report += f"   - Affected Elements: {len(violation['nodes'])}\n"
-            
-            return report
+            # Fallback for contexts that weren't register()ed: inject into this page only
+            if not await page.evaluate("() => typeof window.axe !== 'undefined'"):
+                print("🩺 Injecting Accessibility Engine (Axe-Core)...")
+                source = await cls.engine_source()
+                if source is None:
+                    return AccessibilityResult(url=page.url, tags=tags, error="Could not download auditing engine.")
+                await page.add_script_tag(content=source)
+
+            options = {"resultTypes": ["violations"]}
+            if tags:
+                options["runOnly"] = {"type": "tag", "values": tags}
+            raw = await page.evaluate(AXE_RUN_SCRIPT, options)
+            return AccessibilityResult(url=page.url, tags=tags, violations=raw["violations"])
 
         except Exception as e:
             print(f"❌ Scan Error: {e}")
-            return f"❌ Accessibility Scan Failed: {str(e)}"
\ No newline at end of file
+            return AccessibilityResult(url=page.url, tags=tags, error=str(e))
+
+    @staticmethod
+    async def scan_page(page: Page) -> str:
+        """
+        Injects the 'axe-core' auditing engine into the page and runs a scan.
+        Returns the report as text (see scan() for structured results).
+        """
+        return (await AccessibilityTool.scan(page)).format_report()
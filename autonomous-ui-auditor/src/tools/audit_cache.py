@@ -0,0 +1,94 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Optional
+from src.config import settings
+
+# Runs inside the page: the rendered DOM without the parts that change on
+# every load (inline scripts, CSP nonces) but not what the visitor sees, plus
+# the loaded CSS, so a restyle behind an unchanged <link> changes the snapshot.
+# Cross-origin stylesheets can't be read from the page; only their URL counts.
+DOM_SNAPSHOT_SCRIPT = """() => {
+    const root = document.documentElement.cloneNode(true);
+    root.querySelectorAll("script, noscript, template").forEach(el => el.remove());
+    root.querySelectorAll("[nonce]").forEach(el => el.removeAttribute("nonce"));
+    const sheets = [...document.styleSheets, ...(document.adoptedStyleSheets || [])];
+    const css = sheets.map(sheet => {
+        try {
+            return [...sheet.cssRules].map(rule => rule.cssText).join("\\n");
+        } catch (e) {
+            return sheet.href || "";
+        }
+    });
+    return [root.outerHTML, ...css].join("\\n");
+}"""
+
+def content_key(*parts) -> str:
+    """sha256 over everything an audit result depends on (DOM, screenshot, viewport, prompt version...)."""
+    return hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+async def dom_hash(page) -> Optional[str]:
+    """Hash of the page's rendered DOM and CSS (None if it can't be read, e.g. the page navigated away)."""
+    try:
+        html = await page.evaluate(DOM_SNAPSHOT_SCRIPT)
+    except Exception as e:
+        print(f"⚠️ Could not read the DOM for caching: {e}")
+        return None
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+class AuditCache:
+    """
+    Results of earlier audits (axe-core scans and GPT-4o reports) stored in
+    SQLite under Config.OUTPUT_DIR, keyed by what was actually audited.
+    An unchanged page is not scanned or sent to the model again until its
+    entry is older than `ttl_seconds`. Safe to share between audits.
+
+        cache = AuditCache()
+        report = cache.get("report", key)
+    """
+
+    def __init__(self, path=None, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = settings.AUDIT_CACHE_TTL_S if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path or settings.AUDIT_CACHE_PATH), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS audits ("
+            " kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, key))"
+        )
+        self._db.commit()
+        removed = self.evict_expired()
+        if removed:
+            print(f"🧹 Removed {removed} expired audit cache entries.")
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """The cached value, or None if missing or expired."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM audits WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def set(self, kind: str, key: str, value: Any):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO audits (kind, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(value, ensure_ascii=False), time.time())
+            )
+            self._db.commit()
+
+    def evict_expired(self) -> int:
+        """Deletes entries older than the TTL; returns how many were removed."""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM audits WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
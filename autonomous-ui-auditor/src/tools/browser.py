@@ -1,7 +1,8 @@
+import asyncio
 import base64
-from typing import Dict, Any
-from playwright.async_api import async_playwright
+from typing import Dict, Any, Awaitable, Callable, List, Optional
 from src.config import settings
+from src.tools.browser_pool import BrowserPool
 
 class BrowserTool:
     """
@@ -9,6 +10,84 @@ class BrowserTool:
     Handles browser automation, viewport resizing, and screenshot capture.
     """
 
+    @staticmethod
+    async def capture_viewports(
+        url: str,
+        viewports: Optional[List[str]] = None,
+        pool: Optional[BrowserPool] = None,
+        on_page: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+        on_context: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+        full_page: bool = False,
+        output_dir=None,
+        name: str = "screenshot",
+        encode: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Loads the URL once per viewport, all at the same time, in ONE browser
+        (one isolated context per viewport). Returns {device_type: result}
+        where each result has the same shape as capture_screenshot().
+
+        `pool` lets callers share a long-lived browser; without it a temporary one is used.
+        `on_context(device_type, context)` runs before the page is opened (e.g. to add init scripts).
+        `on_page(device_type, page)` runs on each loaded page before the
+        screenshot (e.g. an accessibility scan on the desktop page).
+        With `encode`, each result also carries the PNG as base64 ("image_data");
+        otherwise only the file path is returned, so site audits don't hold every
+        full-page screenshot in memory.
+        """
+        viewports = viewports or list(settings.VIEWPORTS)
+        invalid = [device for device in viewports if device not in settings.VIEWPORTS]
+        if invalid:
+            # Validation: Fail fast if the device type is wrong
+            raise ValueError(f"Invalid device type {invalid}. Choose: {list(settings.VIEWPORTS.keys())}")
+
+        if pool is None:
+            async with BrowserPool(max_contexts=len(viewports)) as own_pool:
+                return await BrowserTool.capture_viewports(
+                    url, viewports, own_pool, on_page, on_context, full_page, output_dir, name, encode
+                )
+
+        output_dir = output_dir or settings.OUTPUT_DIR
+
+        async def capture(device_type: str) -> Dict[str, Any]:
+            viewport = settings.VIEWPORTS[device_type]
+            screenshot_path = output_dir / f"{name}_{device_type}.png"
+            try:
+                async with pool.context(viewport) as context:
+                    if on_context:
+                        await on_context(device_type, context)
+                    page = await context.new_page()
+
+                    print(f"🌍 Navigating to {url} on {device_type}...")
+                    await page.goto(url, timeout=settings.TIMEOUT_MS, wait_until="domcontentloaded")
+
+                    if on_page:
+                        await on_page(device_type, page)
+
+                    # Snap the picture
+                    await page.screenshot(path=str(screenshot_path), full_page=full_page)
+                    print(f"📸 Screenshot saved to {screenshot_path}")
+
+                result = {
+                    "status": "success",
+                    "path": str(screenshot_path),
+                    "viewport": device_type,
+                    "size": viewport
+                }
+                if encode:
+                    # Convert to Base64 (So the AI can 'see' it without opening the file)
+                    with open(screenshot_path, "rb") as image_file:
+                        result["image_data"] = base64.b64encode(image_file.read()).decode('utf-8')
+                return result
+
+            except Exception as e:
+                # Professional Error Handling: Catch it, report it, don't crash
+                print(f"❌ Error on {device_type}: {e}")
+                return {"status": "error", "viewport": device_type, "message": str(e)}
+
+        results = await asyncio.gather(*(capture(device_type) for device_type in viewports))
+        return dict(zip(viewports, results))
+
     @staticmethod
     async def capture_screenshot(url: str, device_type: str = "desktop") -> Dict[str, Any]:
         """
@@ -20,54 +99,16 @@ class BrowserTool:
         if device_type not in settings.VIEWPORTS:
             return {"error": f"Invalid device type. Choose: {list(settings.VIEWPORTS.keys())}"}
 
-        viewport = settings.VIEWPORTS[device_type]
-        screenshot_path = settings.OUTPUT_DIR / f"screenshot_{device_type}.png"
-
         try:
-            # Context Manager handles opening/closing the browser automatically
-            async with async_playwright() as p:
-                # Launch Chromium (Headless = No visible UI, faster)
-                # Note: If debugging, set headless=False to watch the robot work
-                browser = await p.chromium.launch(headless=True)
-                
-                # Create a context with the specific screen size
-                context = await browser.new_context(
-                    viewport=viewport,
-                    user_agent="Mozilla/5.0 (compatible; UI-Auditor/1.0)"
-                )
-                
-                page = await context.new_page()
-                
-                # Navigate and wait for network to be idle (page fully loaded)
-                print(f"🌍 Navigating to {url} on {device_type}...")
-                await page.goto(url, timeout=settings.TIMEOUT_MS, wait_until="domcontentloaded")
-                
-                # Snap the picture
-                await page.screenshot(path=str(screenshot_path), full_page=False)
-                print(f"📸 Screenshot saved to {screenshot_path}")
-                
-                # Convert to Base64 (So the AI can 'see' it without opening the file)
-                with open(screenshot_path, "rb") as image_file:
-                    encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-
-                await browser.close()
-
-                return {
-                    "status": "success",
-                    "path": str(screenshot_path),
-                    "viewport": device_type,
-                    "image_data": encoded_string
-                }
-
+            results = await BrowserTool.capture_viewports(url, [device_type], encode=True)
+            return results[device_type]
         except Exception as e:
-            # Professional Error Handling: Catch it, report it, don't crash
+            # e.g. the browser failed to launch
             print(f"❌ Error: {e}")
             return {"status": "error", "message": str(e)}
 
 # Quick Test to verify this file works in isolation
 if __name__ == "__main__":
-    import asyncio
-    
     # 1. Define a test function
     async def test_run():
         print("🚀 Starting Test Run...")
@@ -79,5 +120,9 @@ if __name__ == "__main__":
         else:
             print("⛔ Test Failed!")
 
+        # All viewports in one browser, loaded concurrently
+        results = await BrowserTool.capture_viewports("https://google.com")
+        print({device: result['status'] for device, result in results.items()})
+
     # 2. Execute the test
     asyncio.run(test_run())
\ No newline at end of file
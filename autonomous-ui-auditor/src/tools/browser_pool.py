@@ -0,0 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from src.config import settings
+
+class BrowserPool:
+    """
+    One long-lived Chromium shared by many audits.
+    Each page gets its own browser context (cookies, storage and viewport
+    are isolated), and at most `max_contexts` are open at once.
+
+        async with BrowserPool(max_contexts=4) as pool:
+            async with pool.page() as page:
+                await page.goto(url)
+    """
+
+    def __init__(self, max_contexts: int = 4, headless: bool = True):
+        self.max_contexts = max_contexts
+        self.headless = headless
+        self.browser = None
+        self._playwright = None
+        self._slots = asyncio.Semaphore(max_contexts)
+
+    async def __aenter__(self):
+        self._playwright = await async_playwright().start()
+        # Launched once; contexts are cheap compared to a cold browser start
+        self.browser = await self._playwright.chromium.launch(headless=self.headless)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        try:
+            await self.browser.close()
+        finally:
+            await self._playwright.stop()
+
+    @asynccontextmanager
+    async def context(self, viewport: dict = None):
+        """A fresh, isolated browser context; waits for a free slot."""
+        async with self._slots:
+            context = await self.browser.new_context(
+                viewport=viewport or settings.VIEWPORTS["desktop"],
+                user_agent=settings.USER_AGENT
+            )
+            try:
+                yield context
+            finally:
+                await context.close()
+
+    @asynccontextmanager
+    async def page(self, viewport: dict = None):
+        """A new page in its own context, closed (with the context) on exit."""
+        async with self.context(viewport) as context:
+            yield await context.new_page()
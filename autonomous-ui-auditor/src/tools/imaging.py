@@ -0,0 +1,122 @@
+import io
+import math
+import base64
+import hashlib
+from typing import Any, Dict, List, Optional
+from PIL import Image
+from src.config import settings
+
+# GPT-4o "high" detail: the image is fitted into 2048x2048, then its short side
+# is scaled down to 768px. Anything larger is uploaded only to be thrown away.
+MAX_LONG_SIDE = 2048
+MAX_SHORT_SIDE = 768
+# "low" detail: one 512x512 view, whatever the input size
+LOW_DETAIL_SIDE = 512
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+def fit_to_model(image: Image.Image, detail: str = "high") -> Image.Image:
+    """Downscales to the largest size the vision model actually looks at (never upscales)."""
+    if detail == "low":
+        image = image.copy()
+        image.thumbnail((LOW_DETAIL_SIDE, LOW_DETAIL_SIDE), Image.LANCZOS)
+        return image
+
+    width, height = image.size
+    scale = min(1.0, MAX_LONG_SIDE / max(width, height), MAX_SHORT_SIDE / min(width, height))
+    if scale >= 1.0:
+        return image
+    return image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+
+def split_tiles(image: Image.Image, tile_height: int, max_tiles: int) -> List[Image.Image]:
+    """
+    Cuts a tall full-page screenshot into viewport-height slices, so text
+    stays legible instead of being squashed into one thin image.
+    With more than `max_tiles` slices, the slices get taller instead.
+    """
+    width, height = image.size
+    if not tile_height or height <= tile_height:
+        return [image]
+
+    count = min(math.ceil(height / tile_height), max_tiles)
+    step = math.ceil(height / count)
+    return [image.crop((0, top, width, min(top + step, height))) for top in range(0, height, step)]
+
+def encode(image: Image.Image, fmt: str = "JPEG", quality: int = 80) -> bytes:
+    """Re-encodes as real JPEG/WebP (JPEG has no alpha, so it is flattened onto white)."""
+    fmt = fmt.upper()
+    if fmt == "JPEG" and image.mode != "RGB":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+
+    buffer = io.BytesIO()
+    options = {"quality": quality, "optimize": True} if fmt in ("JPEG", "WEBP") else {}
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+def prepare_image(
+    source,
+    tile_height: Optional[int] = None,
+    detail: Optional[str] = None,
+    fmt: Optional[str] = None,
+    quality: Optional[int] = None,
+    max_tiles: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Turns a screenshot (path, bytes or PIL image) into vision-ready images:
+    tiled (if taller than `tile_height`), downscaled to the model's effective
+    resolution and compressed. Defaults come from Config.
+    Returns one dict per tile: data_url, width, height, bytes, detail.
+    """
+    detail = detail or settings.IMAGE_DETAIL
+    fmt = (fmt or settings.IMAGE_FORMAT).upper()
+    quality = quality or settings.IMAGE_QUALITY
+    max_tiles = max_tiles or settings.MAX_TILES
+
+    if isinstance(source, Image.Image):
+        image = source
+    else:
+        image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        image.load()
+
+    # "low" detail is a single 512px view, so tiling would only multiply the cost
+    tiles = split_tiles(image, tile_height, max_tiles) if detail != "low" else [image]
+
+    prepared = []
+    for tile in tiles:
+        tile = fit_to_model(tile, detail)
+        data = encode(tile, fmt, quality)
+        prepared.append({
+            "data_url": f"data:{MIME_TYPES[fmt]};base64,{base64.b64encode(data).decode('utf-8')}",
+            "width": tile.width,
+            "height": tile.height,
+            "bytes": len(data),
+            "detail": detail
+        })
+    return prepared
+
+def image_parts(images: List[Dict[str, Any]], label: str = "") -> List[Dict[str, Any]]:
+    """OpenAI message content for prepared images, each preceded by a text label."""
+    parts = []
+    for i, image in enumerate(images, 1):
+        if label:
+            suffix = f" - part {i}/{len(images)}, top to bottom" if len(images) > 1 else ""
+            parts.append({"type": "text", "text": f"{label}{suffix}:"})
+        parts.append({
+            "type": "image_url",
+            "image_url": {"url": image["data_url"], "detail": image["detail"]}
+        })
+    return parts
+
+def tiles_hash(images: List[Dict[str, Any]]) -> str:
+    """
+    sha256 of prepared images exactly as the model receives them (encoded
+    bytes, format and detail). Any visible change that survives the resize,
+    such as a new color or font, gives a new hash.
+    """
+    digest = hashlib.sha256()
+    for image in images:
+        digest.update(f"{image['detail']}\0{image['data_url']}\0".encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,54 @@
+import gzip
+import asyncio
+import urllib.request
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urldefrag, urlparse
+from src.config import settings
+
+def normalize_url(url: str, base: str = None) -> str:
+    """Absolute URL without the #fragment, so the same page is only audited once."""
+    if base:
+        url = urljoin(base, url)
+    return urldefrag(url)[0]
+
+def origin(url: str) -> tuple:
+    parsed = urlparse(url)
+    return parsed.scheme, parsed.netloc.lower()
+
+def is_auditable(url: str, origins: set) -> bool:
+    """Only http(s) pages on one of the seed origins (no Instagram, LinkedIn, ...)."""
+    return urlparse(url).scheme in ("http", "https") and origin(url) in origins
+
+def _fetch(url: str) -> bytes:
+    request = urllib.request.Request(url, headers={"User-Agent": settings.USER_AGENT})
+    with urllib.request.urlopen(request, timeout=settings.TIMEOUT_MS / 1000) as response:
+        data = response.read()
+    # Sitemaps are often served as .xml.gz
+    return gzip.decompress(data) if data[:2] == b"\x1f\x8b" else data
+
+def _parse_sitemap(url: str, limit: int, seen: set) -> list:
+    root = ET.fromstring(_fetch(url))
+    # Ignore XML namespaces: {http://www.sitemaps.org/...}loc -> loc
+    locs = [el.text.strip() for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "loc" and el.text]
+
+    if root.tag.rsplit("}", 1)[-1] != "sitemapindex":
+        return locs[:limit]
+
+    # A sitemap index lists other sitemaps
+    urls = []
+    for child in locs:
+        if child in seen or len(urls) >= limit:
+            continue
+        seen.add(child)
+        urls.extend(_parse_sitemap(child, limit - len(urls), seen))
+    return urls
+
+async def load_sitemap(url: str, limit: int) -> list:
+    """Page URLs listed in a sitemap (or sitemap index), at most `limit`."""
+    print(f"🗺️  Reading sitemap {url}...")
+    return await asyncio.to_thread(_parse_sitemap, url, limit, {url})
+
+async def extract_links(page) -> list:
+    """Every link on the loaded page, as absolute URLs without fragments."""
+    hrefs = await page.eval_on_selector_all("a[href]", "els => els.map(el => el.href)")
+    return [normalize_url(href, page.url) for href in hrefs]